@@ -1,4 +1,8 @@
 import argparse
+import json
+import multiprocessing
+import os
+import os.path as osp
 import sys
 
 import labelTrack.settings as Settings
@@ -6,22 +10,290 @@ Settings.initialize()
 
 from PyQt6.QtWidgets import QApplication
 from labelTrack.__init__ import __appname__
+from labelTrack.defines import SETTINGS_KEY_PROFILE
+from labelTrack.agreement import compare_label_files
+from labelTrack.agreement import compare_label_trees
+from labelTrack.benchmark import run_benchmarks
+from labelTrack.crops import export_crops
+from labelTrack.exporters import EXPORTERS
+from labelTrack.exporters import export_sequences
+from labelTrack.imagedir import sequence_names
 from labelTrack.mainwindow import MainWindow
+from labelTrack import profiling
+from labelTrack.render import RENDER_FORMATS
+from labelTrack.render import render_sequences
+from labelTrack.replay import SessionRecorder
+from labelTrack.replay import replay_session
+from labelTrack.server import serve
+from labelTrack.shards import merge_shards
+from labelTrack.shards import split_sequence
+from labelTrack.workspace import Workspace
+
+
+def read_sequences(args) -> list[tuple[str, str]]:
+    sequences = [tuple(s) for s in (args.sequence or [])]
+    if args.sequence_list is not None:
+        with open(args.sequence_list, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line == '':
+                    continue
+                image_dir, label_path = line.rsplit(',', 1)
+                sequences.append((image_dir, label_path))
+    if (len(sequences) == 0) and \
+       (args.image_dir is not None) and \
+       (args.label_path is not None):
+        sequences.append((args.image_dir, args.label_path))
+    return sequences
+
+
+def export(args) -> int:
+    sequences = read_sequences(args)
+    if len(sequences) == 0:
+        print('No sequence to export.', file=sys.stderr)
+        return 1
+    ret = 0
+    for image_dir, result in export_sequences(args.export, sequences, args.export_dir, args.jobs):
+        if isinstance(result, Exception):
+            print(f'Failed {image_dir}: {result}', file=sys.stderr)
+            ret = 1
+        else:
+            print(f'Exported {image_dir} to {result}')
+    return ret
+
+
+def crops(args) -> int:
+    sequences = read_sequences(args)
+    if len(sequences) == 0:
+        print('No sequence to export.', file=sys.stderr)
+        return 1
+    def progress(num, total, fps):
+        print(f'\r{num} / {total} ({fps:.1f} fps)', end='', flush=True)
+    ret = 0
+    names = sequence_names([image_dir for image_dir, _ in sequences])
+    for image_dir, label_path in sequences:
+        out_dir = osp.join(args.export_dir, names[image_dir])
+        try:
+            num, failed, fps = export_crops(
+                image_dir, label_path, out_dir,
+                margin=args.crop_margin,
+                size=tuple(args.crop_size),
+                packed=args.crop_packed,
+                jobs=args.jobs,
+                progress=progress)
+        except Exception as e:
+            print(f'\rFailed {image_dir}: {e}', file=sys.stderr)
+            ret = 1
+            continue
+        print(f'\rExported {num} crops of {image_dir} to {out_dir} ({fps:.1f} fps)')
+        if failed > 0:
+            print(f'Failed {failed} frames of {image_dir}, run again to retry them.', file=sys.stderr)
+            ret = 1
+    return ret
+
+
+def render(args) -> int:
+    sequences = read_sequences(args)
+    if len(sequences) == 0:
+        print('No sequence to render.', file=sys.stderr)
+        return 1
+    ret = 0
+    results = render_sequences(
+        args.render, sequences, args.export_dir,
+        width=args.render_width,
+        fps=args.render_fps,
+        grid=tuple(args.sheet_grid),
+        jobs=args.jobs)
+    for image_dir, result in results:
+        if isinstance(result, Exception):
+            print(f'Failed {image_dir}: {result}', file=sys.stderr)
+            ret = 1
+        else:
+            print(f'Rendered {image_dir} to {result}')
+    return ret
+
+
+def format_summary(summary: dict) -> str:
+    return '\t'.join([
+        f'frames={summary["frames"]}',
+        f'mismatches={summary["mismatches"]}',
+        f'mean_iou={summary["mean_iou"]:.4f}',
+        f'auc={summary["auc"]:.4f}',
+        f'precision={summary["precision"]:.4f}',
+        f'mean_center_error={summary["mean_center_error"]:.2f}'])
+
+
+def compare(args) -> int:
+    if args.compare is not None:
+        print(format_summary(compare_label_files(*args.compare)))
+        return 0
+    ret = 0
+    frames = 0
+    iou_sum = 0.0
+    for rel_path, result in compare_label_trees(*args.compare_tree, jobs=args.jobs):
+        if isinstance(result, Exception):
+            print(f'{rel_path}\tfailed: {result}', file=sys.stderr)
+            ret = 1
+            continue
+        print(f'{rel_path}\t{format_summary(result)}')
+        frames += result['frames']
+        iou_sum += result['mean_iou'] * result['frames']
+    if frames > 0:
+        print(f'total\tframes={frames}\tmean_iou={iou_sum / frames:.4f}')
+    return ret
+
+
+def shards(args) -> int:
+    if args.split_shards is not None:
+        if args.image_dir is None:
+            print('--image_dir is required to split a sequence.', file=sys.stderr)
+            return 1
+        try:
+            shard_files = split_sequence(
+                args.image_dir, args.label_path, args.export_dir, args.split_shards,
+                overwrite=args.overwrite)
+        except FileExistsError as e:
+            print(f'{e}, pass --overwrite to replace the shards.', file=sys.stderr)
+            return 1
+        except (OSError, ValueError) as e:
+            print(f'Could not split {args.image_dir}: {e}', file=sys.stderr)
+            return 1
+        for shard_file in shard_files:
+            print(f'Wrote {shard_file}')
+        return 0
+    if args.label_path is None:
+        print('--label_path is required to merge shards.', file=sys.stderr)
+        return 1
+    try:
+        problems = merge_shards(args.merge_shards, args.label_path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f'Could not merge the shards: {e}', file=sys.stderr)
+        return 1
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    print(f'Merged {len(args.merge_shards)} shards into {args.label_path}')
+    return 1 if len(problems) > 0 else 0
+
+
+def benchmark(args) -> int:
+    # one json line per case, appended so that runs can be compared.
+    sizes = [tuple(int(v) for v in s.split('x')) for s in args.benchmark_sizes]
+    out = open(args.benchmark_out, 'a') if args.benchmark_out is not None else sys.stdout
+    try:
+        for result in run_benchmarks(args.benchmark_dir, args.benchmark_frames, sizes):
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+def replay(args) -> int:
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    app = QApplication([])
+    app.setApplicationName(__appname__)
+    win = MainWindow()
+    result = replay_session(args.replay, win, realtime=args.replay_realtime)
+    print(json.dumps(result, indent=4))
+    return 0
+
+
+def workspace(args) -> None:
+    # sequences given along with --workspace are added to it.
+    if osp.exists(args.workspace):
+        ws = Workspace.load(args.workspace)
+    else:
+        ws = Workspace()
+    for image_dir, label_path in read_sequences(args):
+        ws.add(image_dir, label_path)
+    ws.save(args.workspace)
+    print(f'{len(ws)} sequences in {args.workspace}')
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--image_dir', type=str, default=None)
     parser.add_argument('--label_path', type=str, default=None)
+    parser.add_argument('--shard', type=str, default=None)
+    parser.add_argument('--follow', action='store_true')
+    parser.add_argument('--workspace', type=str, default=None)
+    parser.add_argument('--serve', action='store_true')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--serve_root', type=str, nargs='+', default=['.'])
+    parser.add_argument('--server', type=str, default=None, metavar='URL')
+    parser.add_argument('--profile', action='store_true')
+    parser.add_argument('--trace', type=str, default=None, metavar='TRACE_FILE')
+    parser.add_argument('--record', type=str, default=None, metavar='SESSION_FILE')
+    parser.add_argument('--replay', type=str, default=None, metavar='SESSION_FILE')
+    parser.add_argument('--replay_realtime', action='store_true')
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('--benchmark_dir', type=str, default='benchmark')
+    parser.add_argument('--benchmark_frames', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--benchmark_sizes', type=str, nargs='+', default=['640x480', '1920x1080'], metavar='WxH')
+    parser.add_argument('--benchmark_out', type=str, default=None)
+    parser.add_argument('--split_shards', type=int, default=None, metavar='SHARD_SIZE')
+    parser.add_argument('--merge_shards', type=str, nargs='+', default=None, metavar='SHARD')
+    parser.add_argument('--overwrite', action='store_true')
+    parser.add_argument('--export', type=str, default=None, choices=tuple(EXPORTERS))
+    parser.add_argument('--export_dir', type=str, default='export')
+    parser.add_argument('--sequence', type=str, nargs=2, action='append', metavar=('IMAGE_DIR', 'LABEL_PATH'))
+    parser.add_argument('--sequence_list', type=str, default=None)
+    parser.add_argument('--jobs', type=int, default=None)
+    parser.add_argument('--export_crops', action='store_true')
+    parser.add_argument('--crop_margin', type=float, default=0.5)
+    parser.add_argument('--crop_size', type=int, nargs=2, default=[127, 127], metavar=('W', 'H'))
+    parser.add_argument('--crop_packed', action='store_true')
+    parser.add_argument('--render', type=str, default=None, choices=RENDER_FORMATS)
+    parser.add_argument('--render_width', type=int, default=None)
+    parser.add_argument('--render_fps', type=float, default=30.0)
+    parser.add_argument('--sheet_grid', type=int, nargs=2, default=[6, 5], metavar=('COLS', 'ROWS'))
+    parser.add_argument('--compare', type=str, nargs=2, default=None, metavar=('LABEL_A', 'LABEL_B'))
+    parser.add_argument('--compare_tree', type=str, nargs=2, default=None, metavar=('DIR_A', 'DIR_B'))
     args = parser.parse_args()
 
+    if args.export is not None:
+        return export(args)
+    if args.export_crops:
+        return crops(args)
+    if args.render is not None:
+        return render(args)
+    if (args.compare is not None) or (args.compare_tree is not None):
+        return compare(args)
+    if (args.split_shards is not None) or (args.merge_shards is not None):
+        return shards(args)
+    if args.benchmark:
+        return benchmark(args)
+    if args.replay is not None:
+        return replay(args)
+    if args.serve:
+        print(f'Serving on {args.host}:{args.port}')
+        serve(args.serve_root, args.host, args.port)
+        return 0
+
+    if (args.workspace is not None) and \
+       ((args.sequence is not None) or (args.sequence_list is not None) or
+        (not osp.exists(args.workspace))):
+        workspace(args)
+
+    profiling.enable(args.profile or (args.trace is not None) or Settings.settings.get(SETTINGS_KEY_PROFILE, False))
+
     app = QApplication([])
     app.setApplicationName(__appname__)
 
-    win = MainWindow(args.image_dir, args.label_path)
+    win = MainWindow(args.image_dir, args.label_path, args.shard, args.follow, args.workspace, args.server)
     win.show()
-    return app.exec()
+    recorder = SessionRecorder(win, args.record) if args.record is not None else None
+    ret = app.exec()
+    if recorder is not None:
+        recorder.stop()
+    if args.trace is not None:
+        profiling.export_chrome_trace(args.trace)
+    return ret
 
 
 if __name__ == '__main__':
+    # the process pools spawn workers, which relaunch a frozen executable.
+    multiprocessing.freeze_support()
     sys.exit(main())
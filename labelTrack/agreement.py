@@ -0,0 +1,154 @@
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from math import sqrt
+import os
+import os.path as osp
+from typing import Iterator
+from typing import Optional
+from labelTrack.bbox import BBox
+from labelTrack.history import pack_bboxes
+from labelTrack.outliers import iou
+
+
+SUCCESS_THRESHOLDS: list[float] = [i / 20 for i in range(21)]
+PRECISION_THRESHOLD: float = 20.0
+
+
+class Agreement(object):
+
+    # per-frame agreement between two label files of the same sequence.
+    # a frame labeled in only one of them counts as iou 0, and a frame
+    # labeled in neither is left out of the summary. the bboxes may be given
+    # packed as 4 doubles each, which is compared in one pass without
+    # building a bbox per frame.
+
+    def __init__(self, bboxes_a: list[BBox] | array, bboxes_b: list[BBox] | array) -> None:
+        if not isinstance(bboxes_a, array):
+            bboxes_a = pack_bboxes(bboxes_a)
+        if not isinstance(bboxes_b, array):
+            bboxes_b = pack_bboxes(bboxes_b)
+        ious, center_errors = _compare(bboxes_a, bboxes_b)
+        self.ious: list[Optional[float]] = ious
+        self.center_errors: list[Optional[float]] = center_errors
+
+    def __len__(self) -> int:
+        return len(self.ious)
+
+    def append(self, num: int) -> None:
+        self.ious.extend([None] * num)
+        self.center_errors.extend([None] * num)
+
+    def update(self, idx: int, a: BBox, b: BBox) -> None:
+        empty_a = a.empty()
+        empty_b = b.empty()
+        if empty_a and empty_b:
+            self.ious[idx] = None
+            self.center_errors[idx] = None
+        elif empty_a or empty_b:
+            self.ious[idx] = 0.0
+            self.center_errors[idx] = None
+        else:
+            self.ious[idx] = iou(a, b)
+            self.center_errors[idx] = sqrt((a.cx() - b.cx()) ** 2 + (a.cy() - b.cy()) ** 2)
+
+    def mismatched(self, idx: int) -> bool:
+        return (self.ious[idx] is not None) and (self.center_errors[idx] is None)
+
+    def worst_frames(self) -> list[int]:
+        frames = [idx for idx, v in enumerate(self.ious) if v is not None]
+        frames.sort(key=lambda idx: self.ious[idx])
+        return frames
+
+    def summary(self) -> dict:
+        ious = [v for v in self.ious if v is not None]
+        errors = [v for v in self.center_errors if v is not None]
+        num = len(ious)
+        if num == 0:
+            return {
+                'frames': 0, 'mismatches': 0, 'mean_iou': 0.0,
+                'auc': 0.0, 'precision': 0.0, 'mean_center_error': 0.0}
+        ious.sort()
+        # success rate at each threshold t is the fraction of ious above t.
+        success = [(num - bisect_right(ious, t)) / num for t in SUCCESS_THRESHOLDS]
+        return {
+            'frames': num,
+            'mismatches': num - len(errors),
+            'mean_iou': sum(ious) / num,
+            'auc': sum(success) / len(success),
+            'precision': sum(1 for e in errors if e <= PRECISION_THRESHOLD) / num,
+            'mean_center_error': sum(errors) / len(errors) if len(errors) > 0 else 0.0}
+
+
+def read_label_values(label_file: str) -> array:
+    # the bboxes of a label file packed as 4 doubles each.
+    with open(label_file, 'r') as f:
+        lines = f.read().split()
+    return array('d', map(float, ','.join(lines).split(','))) if len(lines) > 0 else array('d')
+
+
+def compare_label_files(label_file_a: str, label_file_b: str) -> dict:
+    agreement = Agreement(read_label_values(label_file_a), read_label_values(label_file_b))
+    return agreement.summary()
+
+
+def _compare(a: array, b: array) -> tuple[list[Optional[float]], list[Optional[float]]]:
+    # the same as update over every frame, with the bbox tests inlined.
+    # nan marks a missing value, and a bbox of negative values is empty.
+    num = max(len(a), len(b)) // 4
+    a = a + array('d', [-1.0]) * (num * 4 - len(a))
+    b = b + array('d', [-1.0]) * (num * 4 - len(b))
+    ious = [None] * num
+    errors = [None] * num
+    ia = iter(a)
+    ib = iter(b)
+    for idx, ((xa, ya, wa, ha), (xb, yb, wb, hb)) in enumerate(zip(zip(ia, ia, ia, ia), zip(ib, ib, ib, ib))):
+        empty_a = (xa != xa) or (ya != ya) or (wa != wa) or (ha != ha) or \
+                  (xa < 0.0 and ya < 0.0 and wa < 0.0 and ha < 0.0)
+        empty_b = (xb != xb) or (yb != yb) or (wb != wb) or (hb != hb) or \
+                  (xb < 0.0 and yb < 0.0 and wb < 0.0 and hb < 0.0)
+        if empty_a and empty_b:
+            continue
+        if empty_a or empty_b:
+            ious[idx] = 0.0
+            continue
+        xa2 = xa + wa
+        xb2 = xb + wb
+        ya2 = ya + ha
+        yb2 = yb + hb
+        iw = (xa2 if xa2 < xb2 else xb2) - (xa if xa > xb else xb)
+        ih = (ya2 if ya2 < yb2 else yb2) - (ya if ya > yb else yb)
+        if (iw <= 0.0) or (ih <= 0.0):
+            ious[idx] = 0.0
+        else:
+            inter = iw * ih
+            union = wa * ha + wb * hb - inter
+            ious[idx] = inter / union if union > 0.0 else 0.0
+        dx = (xa + xa2 - xb - xb2) / 2.0
+        dy = (ya + ya2 - yb - yb2) / 2.0
+        errors[idx] = sqrt(dx * dx + dy * dy)
+    return ious, errors
+
+
+def compare_label_trees(
+        dir_a: str,
+        dir_b: str,
+        jobs: Optional[int] = None
+        ) -> Iterator[tuple[str, dict | Exception]]:
+    pairs = []
+    for root, _, files in os.walk(dir_a):
+        for file in sorted(files):
+            if osp.splitext(file)[1] != '.txt':
+                continue
+            rel_path = osp.relpath(osp.join(root, file), dir_a)
+            if osp.exists(osp.join(dir_b, rel_path)):
+                pairs.append(rel_path)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(compare_label_files, osp.join(dir_a, p), osp.join(dir_b, p))
+            for p in pairs]
+        for rel_path, future in zip(pairs, futures):
+            try:
+                yield rel_path, future.result()
+            except Exception as e:
+                yield rel_path, e
@@ -0,0 +1,139 @@
+from dataclasses import dataclass
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+from typing import Self
+from PyQt6.QtCore import QPointF
+
+
+@dataclass
+class BBox:
+    x: Optional[float] = None
+    y: Optional[float] = None
+    w: Optional[float] = None
+    h: Optional[float] = None
+
+    def empty(self) -> bool:
+        return (self.x is None) or \
+               (self.y is None) or \
+               (self.w is None) or \
+               (self.h is None) or \
+               (self.x < 0.0 and
+                self.y < 0.0 and
+                self.w < 0.0 and
+                self.h < 0.0)
+
+    def xmin(self) -> float:
+        return self.x
+
+    def ymin(self) -> float:
+        return self.y
+
+    def xmax(self) -> float:
+        return self.x + self.w
+
+    def ymax(self) -> float:
+        return self.y + self.h
+
+    def cx(self) -> float:
+        return self.x + self.w / 2.0
+
+    def cy(self) -> float:
+        return self.y + self.h / 2.0
+
+    def move(self, dx: float, dy: float) -> None:
+        self.x += dx
+        self.y += dy
+
+    def get_xy(self, idx: int) -> tuple[float, float]:
+        if idx == 0:
+            return self.x, self.y
+        if idx == 1:
+            return self.x + self.w, self.y
+        if idx == 2:
+            return self.x + self.w, self.y + self.h
+        if idx == 3:
+            return self.x, self.y + self.h
+        raise IndexError()
+
+    def set_xy(self, pidx: int, x: float, y: float) -> None:
+        if not (0 <= pidx < 4):
+            raise IndexError()
+        x1, y1 = x, y
+        x2, y2 = self.get_xy((pidx + 2) % 4)
+        self.x = min(x1, x2)
+        self.y = min(y1, y2)
+        self.w = abs(x2 - x1)
+        self.h = abs(y2 - y1)
+
+    def get_point(self, idx: int) -> QPointF:
+        x, y = self.get_xy(idx)
+        return QPointF(x, y)
+
+    def __str__(self) -> str:
+        if self.empty():
+            return '-1.00,-1.00,-1.00,-1.00'
+        return f'{self.x:.2f},{self.y:.2f},{self.w:.2f},{self.h:.2f}'
+
+    @classmethod
+    def from_xmin_ymin_xmax_ymax(
+            cls: Self,
+            xmin: float, ymin: float,
+            xmax: float, ymax: float) -> Self:
+        return cls(x=xmin,
+                   y=ymin,
+                   w=xmax - xmin,
+                   h=ymax - ymin)
+
+
+def clip(
+        value: int | float,
+        lower: int | float,
+        upper: int | float):
+    return max(lower, min(value, upper))
+
+
+def in_image(bbox: BBox, w: int | float, h: int | float) -> bool:
+    return (0 <= bbox.xmin()) and \
+           (bbox.xmax() <= w) and \
+           (0 <= bbox.ymin()) and \
+           (bbox.ymax() <= h)
+
+
+def intersection(bbox: BBox, w: int | float, h: int | float) -> BBox:
+    xmin = max(bbox.xmin(), 0.0)
+    ymin = max(bbox.ymin(), 0.0)
+    xmax = min(bbox.xmax(), w)
+    ymax = min(bbox.ymax(), h)
+    if (xmax <= xmin) or (ymax <= ymin):
+        return BBox()
+    return BBox.from_xmin_ymin_xmax_ymax(
+        xmin, ymin, xmax, ymax)
+
+
+def out_of_image(
+        bboxes: list[BBox],
+        sizes: list[Optional[tuple[int, int]]]
+        ) -> list[int]:
+    # frames whose size is unknown are skipped.
+    return [idx for idx, (bbox, size) in enumerate(zip(bboxes, sizes))
+            if (size is not None) and
+               (not bbox.empty()) and
+               (not in_image(bbox, *size))]
+
+
+def parse_bbox(line: str) -> BBox:
+    s = line.split(',')
+    return BBox(x=float(s[0]), y=float(s[1]), w=float(s[2]), h=float(s[3]))
+
+
+def iter_label_file(label_file: str) -> Iterator[BBox]:
+    with open(label_file, 'r') as f:
+        for line in f:
+            yield parse_bbox(line)
+
+
+def write_label_file(label_file: str, bboxes: Iterable[BBox]) -> None:
+    with open(label_file, 'w') as f:
+        for bbox in bboxes:
+            f.write(str(bbox) + '\n')
@@ -0,0 +1,182 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import os.path as osp
+import platform
+import shutil
+import time
+from time import perf_counter
+from typing import Iterator
+from typing import Optional
+from PyQt6.QtCore import QT_VERSION_STR
+from PyQt6.QtCore import QRectF
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QColor
+from PyQt6.QtGui import QImage
+from PyQt6.QtGui import QLinearGradient
+from PyQt6.QtGui import QPainter
+from labelTrack.bbox import BBox
+from labelTrack.bbox import write_label_file
+
+
+STEP_COUNT: int = 200
+REPAINT_COUNT: int = 200
+
+
+def percentiles(values: list[float]) -> dict:
+    values = sorted(values)
+    num = len(values)
+    if num == 0:
+        return {'count': 0}
+    return {
+        'count': num,
+        'p50_ms': values[(num - 1) // 2] * 1e3,
+        'p95_ms': values[min(num - 1, int(num * 0.95))] * 1e3,
+        'max_ms': values[-1] * 1e3}
+
+
+def synthetic_bbox(idx: int, w: int, h: int) -> BBox:
+    # a box sweeping across the frame and back.
+    t = (idx % 200) / 200
+    t = 2 * t if t < 0.5 else 2 - 2 * t
+    bw, bh = w / 8, h / 6
+    return BBox(x=t * (w - bw), y=(h - bh) / 2, w=bw, h=bh)
+
+
+def make_sequence(out_dir: str, frames: int, size: tuple[int, int]) -> tuple[str, str]:
+    # every frame is a hard link of one encoded image, so that large
+    # sequences take little time and space to generate.
+    w, h = size
+    name = f'{frames}_{w}x{h}'
+    image_dir = osp.join(out_dir, name)
+    label_file = osp.join(out_dir, f'{name}.txt')
+    if osp.exists(osp.join(image_dir, '.done')):
+        return image_dir, label_file
+    shutil.rmtree(image_dir, ignore_errors=True)
+    os.makedirs(image_dir)
+    img = QImage(w, h, QImage.Format.Format_RGB32)
+    p = QPainter(img)
+    gradient = QLinearGradient(0, 0, w, h)
+    gradient.setColorAt(0, QColor(40, 60, 90))
+    gradient.setColorAt(1, QColor(200, 180, 120))
+    p.fillRect(QRectF(0, 0, w, h), gradient)
+    p.setPen(Qt.PenStyle.NoPen)
+    for i in range(64):
+        p.setBrush(QColor((i * 37) % 256, (i * 91) % 256, (i * 53) % 256))
+        p.drawEllipse(QRectF((i * 131) % w, (i * 71) % h, w / 12, h / 12))
+    p.end()
+    source = osp.join(image_dir, 'source.jpg')
+    img.save(source, 'JPEG', 90)
+    for idx in range(frames):
+        target = osp.join(image_dir, f'{idx:06d}.jpg')
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copyfile(source, target)
+    os.remove(source)
+    write_label_file(label_file, (synthetic_bbox(idx, w, h) for idx in range(frames)))
+    open(osp.join(image_dir, '.done'), 'w').close()
+    return image_dir, label_file
+
+
+def run_case(work_dir: str, image_dir: str, label_file: str) -> dict:
+    # runs in a fresh process, so that the memory high-water mark belongs
+    # to this case alone.
+    os.chdir(work_dir)
+    os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+    import labelTrack.settings as Settings
+    Settings.initialize()
+    from PyQt6.QtWidgets import QApplication
+    from labelTrack.imagedir import ImageDir
+    from labelTrack.mainwindow import MainWindow
+    app = QApplication.instance() or QApplication([])
+    result = {}
+
+    index = ImageDir(image_dir)
+    if osp.exists(index.manifest_path()):
+        os.remove(index.manifest_path())
+    start = perf_counter()
+    index = ImageDir(image_dir)
+    index.sizes()
+    index.save()
+    result['scan_cold_s'] = perf_counter() - start
+    start = perf_counter()
+    ImageDir(image_dir).sizes()
+    result['scan_warm_s'] = perf_counter() - start
+
+    win = MainWindow()
+    win.resize(1280, 800)
+    win.show()
+    app.processEvents()
+    start = perf_counter()
+    win._MainWindow__load_image_dir(image_dir)
+    app.processEvents()
+    result['open_dir_s'] = perf_counter() - start
+    start = perf_counter()
+    win._MainWindow__load_label_file(label_file)
+    app.processEvents()
+    result['label_load_s'] = perf_counter() - start
+    win._MainWindow__set_dirty(True)
+    start = perf_counter()
+    win._MainWindow__save_label_file()
+    result['label_save_s'] = perf_counter() - start
+
+    steps = []
+    for _ in range(min(STEP_COUNT, len(win._image_files) - 1)):
+        start = perf_counter()
+        win.next_image_action.trigger()
+        app.processEvents()
+        steps.append(perf_counter() - start)
+    result['frame_step'] = percentiles(steps)
+
+    # a drag repaints the canvas once per mouse move.
+    repaints = []
+    bbox = BBox(10.0, 10.0, 100.0, 80.0)
+    for _ in range(REPAINT_COUNT):
+        bbox.move(1.0, 0.5)
+        win.canvas.bbox = BBox(bbox.x, bbox.y, bbox.w, bbox.h)
+        start = perf_counter()
+        win.canvas.repaint()
+        repaints.append(perf_counter() - start)
+    result['drag_repaint'] = percentiles(repaints)
+
+    win._MainWindow__set_dirty(False)
+    win.hide()
+    win.deleteLater()
+    app.processEvents()
+    result['max_rss_mb'] = _max_rss_mb()
+    return result
+
+
+def _max_rss_mb() -> Optional[float]:
+    # resource is only available on unix.
+    if platform.system() == 'Windows':
+        return None
+    import resource
+    # ru_maxrss is in kilobytes on linux and in bytes on macos.
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024 if platform.system() == 'Darwin' else 1024)
+
+
+def run_benchmarks(
+        out_dir: str,
+        frames: list[int],
+        sizes: list[tuple[int, int]]
+        ) -> Iterator[dict]:
+    os.makedirs(out_dir, exist_ok=True)
+    out_dir = osp.abspath(out_dir)
+    context = multiprocessing.get_context('spawn')
+    for num in frames:
+        for size in sizes:
+            image_dir, label_file = make_sequence(out_dir, num, size)
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(run_case, out_dir, image_dir, label_file).result()
+            yield {
+                'frames': num,
+                'width': size[0],
+                'height': size[1],
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'qt': QT_VERSION_STR,
+                'machine': platform.node(),
+                **result}
@@ -0,0 +1,191 @@
+import http.client
+import json
+import os
+import os.path as osp
+import socket
+import uuid
+from typing import Optional
+from urllib.parse import urlencode
+from urllib.parse import urlparse
+from PyQt6.QtCore import QThread
+from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtGui import QImage
+from labelTrack.bbox import BBox
+from labelTrack.bbox import parse_bbox
+
+
+EVENT_POLL_TIMEOUT: float = 1.0
+
+
+class ServerError(Exception):
+    pass
+
+
+class ServerClient(object):
+
+    # one keep-alive connection to an annotation server. a connection is
+    # not shared between threads, so each thread makes its own client.
+
+    def __init__(self, url: str, client_id: Optional[str] = None) -> None:
+        parsed = urlparse(url if '://' in url else f'http://{url}')
+        self.url: str = url
+        self.host: str = parsed.hostname
+        self.port: int = parsed.port or 8765
+        self.client_id: str = client_id if client_id is not None else f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}'
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def sequence(self, image_dir: str) -> tuple[str, list[str], list[Optional[tuple[int, int]]]]:
+        data = self.__get_json('/sequence', image_dir=image_dir)
+        return (
+            data['image_dir'],
+            [osp.join(data['image_dir'], f) for f in data['files']],
+            [tuple(s) if s is not None else None for s in data['sizes']])
+
+    def image(self, image_dir: str, file_path: str) -> QImage:
+        data = self.__request('GET', '/frame', query={'image_dir': image_dir, 'name': osp.basename(file_path)})
+        return QImage.fromData(data)
+
+    def labels(self, label_path: str) -> tuple[int, list[BBox], dict[int, str]]:
+        data = self.__get_json('/labels', label_path=label_path)
+        return (
+            data['version'],
+            [parse_bbox(b) for b in data['bboxes']],
+            {int(idx): client for idx, client in data['locks'].items()})
+
+    def events(
+            self,
+            label_path: str,
+            since: int,
+            timeout: float = EVENT_POLL_TIMEOUT
+            ) -> tuple[int, Optional[list[tuple[int, BBox, str]]]]:
+        # None instead of the changes means the client has to reload.
+        data = self.__get_json(
+            '/events', label_path=label_path, since=since, timeout=timeout, client=self.client_id)
+        if data['reset']:
+            return data['version'], None
+        return data['version'], [(idx, parse_bbox(b), client) for idx, b, client in data['changes']]
+
+    def lock(self, label_path: str, idx: int) -> Optional[str]:
+        data = self.__post_json('/lock', label_path=label_path, idx=idx)
+        return data['holder']
+
+    def unlock(self, label_path: str) -> None:
+        self.__post_json('/unlock', label_path=label_path)
+
+    def update(self, label_path: str, bboxes: list[tuple[int, BBox]]) -> list[int]:
+        data = self.__post_json(
+            '/update', label_path=label_path,
+            bboxes=[[idx, str(bbox)] for idx, bbox in bboxes])
+        return data['rejected']
+
+    def save(self, label_path: str) -> None:
+        self.__post_json('/save', label_path=label_path)
+
+    def __get_json(self, path: str, **query) -> dict:
+        return json.loads(self.__request('GET', path, query=query))
+
+    def __post_json(self, path: str, **body) -> dict:
+        body['client'] = self.client_id
+        return json.loads(self.__request('POST', path, body=json.dumps(body).encode('utf-8')))
+
+    def __request(self, method: str, path: str, query: Optional[dict] = None, body: Optional[bytes] = None) -> bytes:
+        if query is not None:
+            path += '?' + urlencode(query)
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        # a kept-alive connection closed by the server is retried once.
+        for retry in (True, False):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                self._conn.request(method, path, body=body, headers=headers)
+                response = self._conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, OSError) as e:
+                self.close()
+                if not retry:
+                    raise ServerError(f'{self.url}: {e}') from e
+        if response.status != 200:
+            raise ServerError(json.loads(data).get('error', f'HTTP {response.status}'))
+        return data
+
+
+class RemoteImageDir(object):
+
+    # the image listing and sizes of a directory as served by the server,
+    # in place of an ImageDir.
+
+    def __init__(self, client: ServerClient, image_dir: str, files: Optional[list[str]] = None) -> None:
+        self.image_dir, self.files, self._sizes = client.sequence(image_dir)
+        if files is not None:
+            listed = set(files)
+            kept = [i for i, f in enumerate(self.files) if osp.basename(f) in listed]
+            self.files = [self.files[i] for i in kept]
+            self._sizes = [self._sizes[i] for i in kept]
+        self._hashes: list[Optional[int]] = [None] * len(self.files)
+        self._valid: list[Optional[bool]] = [None] * len(self.files)
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def size(self, idx: int) -> Optional[tuple[int, int]]:
+        return self._sizes[idx]
+
+    def sizes(self) -> list[Optional[tuple[int, int]]]:
+        return self._sizes
+
+    def hashes(self) -> list[Optional[int]]:
+        return self._hashes
+
+    def set_hash(self, idx: int, h: Optional[int]) -> None:
+        self._hashes[idx] = h
+
+    def valid(self) -> list[Optional[bool]]:
+        return self._valid
+
+    def set_valid(self, idx: int, ok: bool) -> None:
+        self._valid[idx] = ok
+
+    def append(self, files: list[str]) -> None:
+        self.files.extend(files)
+        self._sizes.extend([None] * len(files))
+        self._hashes.extend([None] * len(files))
+        self._valid.extend([None] * len(files))
+
+    def save(self) -> None:
+        pass
+
+
+class EventThread(QThread):
+
+    # long-polls the changes of a label file made by the other clients.
+
+    changed = pyqtSignal(list)
+    reset = pyqtSignal()
+
+    def __init__(self, url: str, client_id: str, label_path: str, version: int, parent=None) -> None:
+        super(EventThread, self).__init__(parent)
+        self._client: ServerClient = ServerClient(url, client_id)
+        self._label_path: str = label_path
+        self._version: int = version
+
+    def run(self) -> None:
+        while not self.isInterruptionRequested():
+            try:
+                version, changes = self._client.events(self._label_path, self._version)
+            except ServerError:
+                self.msleep(int(EVENT_POLL_TIMEOUT * 1000))
+                continue
+            self._version = version
+            if changes is None:
+                self.reset.emit()
+                continue
+            changes = [(idx, bbox) for idx, bbox, client in changes if client != self._client.client_id]
+            if len(changes) > 0:
+                self.changed.emit(changes)
+        self._client.close()
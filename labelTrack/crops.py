@@ -0,0 +1,201 @@
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import os.path as osp
+import time
+from typing import Callable
+from typing import Optional
+from PyQt6.QtCore import QRect
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage
+from PyQt6.QtGui import QImageReader
+from labelTrack.bbox import BBox
+from labelTrack.exporters import iter_frames
+from labelTrack.imagedir import ImageDir
+
+
+def crop_region(bbox: BBox, margin: float) -> tuple[int, int, int, int]:
+    # the bbox grown by margin times its size on every side.
+    x = bbox.x - margin * bbox.w
+    y = bbox.y - margin * bbox.h
+    w = bbox.w * (1.0 + 2.0 * margin)
+    h = bbox.h * (1.0 + 2.0 * margin)
+    return int(round(x)), int(round(y)), max(1, int(round(w))), max(1, int(round(h)))
+
+
+def crop_image(
+        file_path: str,
+        region: tuple[int, int, int, int],
+        size: tuple[int, int]
+        ) -> Optional[QImage]:
+    reader = QImageReader(file_path)
+    reader.setAutoTransform(True)
+    img = reader.read()
+    if img.isNull():
+        return None
+    # pixels outside of the image are filled with zero.
+    img = img.copy(QRect(*region))
+    img = img.scaled(
+        size[0], size[1],
+        Qt.AspectRatioMode.IgnoreAspectRatio,
+        Qt.TransformationMode.SmoothTransformation)
+    return img.convertToFormat(QImage.Format.Format_RGB888)
+
+
+def image_bytes(img: QImage) -> bytes:
+    w, h = img.width(), img.height()
+    bpl = img.bytesPerLine()
+    data = img.constBits().asstring(img.sizeInBytes())
+    if bpl == 3 * w:
+        return data
+    return b''.join(data[i * bpl:i * bpl + 3 * w] for i in range(h))
+
+
+def _crop_to_file(
+        file_path: str,
+        region: tuple[int, int, int, int],
+        size: tuple[int, int],
+        out_path: str
+        ) -> bool:
+    img = crop_image(file_path, region, size)
+    if img is None:
+        return False
+    tmp_path = out_path + '.tmp.png'
+    if not img.save(tmp_path):
+        return False
+    os.replace(tmp_path, out_path)
+    return True
+
+
+def _crop_to_bytes(
+        file_path: str,
+        region: tuple[int, int, int, int],
+        size: tuple[int, int]
+        ) -> Optional[bytes]:
+    img = crop_image(file_path, region, size)
+    if img is None:
+        return None
+    return image_bytes(img)
+
+
+class PackedCrops(object):
+
+    # crops are laid out in frame order with a fixed stride in crops.bin,
+    # and a done byte per record in crops.done is flushed after its data,
+    # so that an interrupted export resumes where it stopped.
+
+    def __init__(
+            self,
+            out_dir: str,
+            tasks: list[tuple[int, str, tuple[int, int, int, int]]],
+            size: tuple[int, int]
+            ) -> None:
+        w, h = size
+        self._record_size: int = w * h * 3
+        meta = {
+            'dtype': 'uint8',
+            'shape': [len(tasks), h, w, 3],
+            'frames': [idx for idx, _, _ in tasks],
+            'files': [osp.basename(file_path) for _, file_path, _ in tasks]}
+        meta_path = osp.join(out_dir, 'crops.json')
+        data_path = osp.join(out_dir, 'crops.bin')
+        done_path = osp.join(out_dir, 'crops.done')
+        self._done: bytearray = bytearray(len(tasks))
+        resumable = False
+        if osp.exists(meta_path) and osp.exists(data_path) and osp.exists(done_path):
+            with open(meta_path, 'r') as f:
+                resumable = json.load(f) == meta
+        if resumable:
+            with open(done_path, 'rb') as f:
+                done = f.read(len(tasks))
+            self._done[:len(done)] = done
+        else:
+            with open(meta_path, 'w') as f:
+                json.dump(meta, f)
+            with open(data_path, 'wb') as f:
+                f.truncate(len(tasks) * self._record_size)
+            with open(done_path, 'wb') as f:
+                f.write(self._done)
+        self._data_f = open(data_path, 'r+b')
+        self._done_f = open(done_path, 'r+b')
+
+    def close(self) -> None:
+        self._data_f.close()
+        self._done_f.close()
+
+    def pending(self) -> list[int]:
+        return [r for r, done in enumerate(self._done) if not done]
+
+    def write(self, r: int, data: Optional[bytes]) -> None:
+        if data is None:
+            return
+        self._data_f.seek(r * self._record_size)
+        self._data_f.write(data)
+        self._data_f.flush()
+        self._done_f.seek(r)
+        self._done_f.write(b'\x01')
+        self._done_f.flush()
+        self._done[r] = 1
+
+
+def crop_file_path(out_dir: str, file_path: str) -> str:
+    stem = osp.splitext(osp.basename(file_path))[0]
+    return osp.join(out_dir, f'{stem}.png')
+
+
+def export_crops(
+        image_dir: str,
+        label_file: str,
+        out_dir: str,
+        margin: float = 0.5,
+        size: tuple[int, int] = (127, 127),
+        packed: bool = False,
+        jobs: Optional[int] = None,
+        progress: Optional[Callable[[int, int, float], None]] = None
+        ) -> tuple[int, int, float]:
+    # returns the number of crops written, of frames that could not be
+    # cropped and the throughput in frames per second.
+    image_index = ImageDir(image_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = [
+        (idx, file_path, crop_region(bbox, margin))
+        for idx, file_path, bbox in iter_frames(image_index, label_file)
+        if not bbox.empty()]
+    packed_crops = PackedCrops(out_dir, tasks, size) if packed else None
+    if packed_crops is not None:
+        pending = packed_crops.pending()
+    else:
+        # a png is renamed into place only once it is complete.
+        pending = [
+            r for r, (_, file_path, _) in enumerate(tasks)
+            if not osp.exists(crop_file_path(out_dir, file_path))]
+    file_paths = [tasks[r][1] for r in pending]
+    regions = [tasks[r][2] for r in pending]
+    sizes = [size] * len(pending)
+    num = 0
+    failed = 0
+    t0 = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            if packed_crops is not None:
+                results = executor.map(
+                    _crop_to_bytes, file_paths, regions, sizes, chunksize=16)
+            else:
+                out_paths = [crop_file_path(out_dir, file_path) for file_path in file_paths]
+                results = executor.map(
+                    _crop_to_file, file_paths, regions, sizes, out_paths, chunksize=16)
+            for r, result in zip(pending, results):
+                if packed_crops is not None:
+                    packed_crops.write(r, result)
+                if (result is None) or (result is False):
+                    failed += 1
+                num += 1
+                if progress is not None:
+                    elapsed = time.perf_counter() - t0
+                    progress(num, len(pending), num / elapsed if elapsed > 0.0 else 0.0)
+    finally:
+        if packed_crops is not None:
+            packed_crops.close()
+        image_index.save()
+    elapsed = time.perf_counter() - t0
+    return num - failed, failed, (num / elapsed if elapsed > 0.0 else 0.0)
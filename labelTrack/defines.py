@@ -1,4 +1,5 @@
 SETTINGS_FILE: str = 'settings.json'
+CACHE_DIR: str = 'cache'
 SETTINGS_KEY_IMAGE_DIR: tuple[str] = ('image_dir',)
 SETTINGS_KEY_LABEL_PATH: tuple[str] = ('label_path',)
 SETTINGS_KEY_WINDOW_X: tuple[str] = ('window', 'x')
@@ -6,6 +7,19 @@ SETTINGS_KEY_WINDOW_Y: tuple[str] = ('window', 'y')
 SETTINGS_KEY_WINDOW_W: tuple[str] = ('window', 'w')
 SETTINGS_KEY_WINDOW_H: tuple[str] = ('window', 'h')
 SETTINGS_KEY_AUTO_SAVE: tuple[str] = ('auto_save',)
+SETTINGS_KEY_OUTLIER_MIN_IOU: tuple[str] = ('outlier', 'min_iou')
+SETTINGS_KEY_OUTLIER_MAX_VELOCITY: tuple[str] = ('outlier', 'max_velocity')
+SETTINGS_KEY_OUTLIER_MAX_SCALE: tuple[str] = ('outlier', 'max_scale')
+SETTINGS_KEY_FRAME_CACHE_MB: tuple[str] = ('frame_cache', 'max_mb')
+SETTINGS_KEY_PROFILE: tuple[str] = ('profile',)
+SETTINGS_KEY_HISTORY_MB: tuple[str] = ('history', 'max_mb')
+SETTINGS_KEY_CHECK_FRAMES: tuple[str] = ('check_frames',)
+SETTINGS_KEY_MIRROR: tuple[str] = ('mirror', 'enabled')
+SETTINGS_KEY_MIRROR_DIR: tuple[str] = ('mirror', 'dir')
+SETTINGS_KEY_MIRROR_MB: tuple[str] = ('mirror', 'max_mb')
+SETTINGS_KEY_LOUPE: tuple[str] = ('loupe', 'enabled')
+SETTINGS_KEY_LOUPE_ZOOM: tuple[str] = ('loupe', 'zoom')
+SETTINGS_KEY_LOUPE_SIZE: tuple[str] = ('loupe', 'size')
 
 CANVAS_CREATE_MODE: int = 1
 CANVAS_EDIT_MODE: int = 2
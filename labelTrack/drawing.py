@@ -0,0 +1,68 @@
+from typing import Optional
+from PyQt6.QtCore import QRectF
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QColor
+from PyQt6.QtGui import QPainter
+from PyQt6.QtGui import QPainterPath
+from PyQt6.QtGui import QPen
+from labelTrack.bbox import BBox
+
+
+BBOX_COLOR              = QColor(  0, 255,   0, 128)
+BBOX_HIGHLIGHTED_COLOR  = QColor(255,   0,   0, 255)
+POINT_COLOR             = QColor(  0, 255,   0, 255)
+POINT_HIGHLIGHTED_COLOR = QColor(255,   0,   0, 255)
+REF_BBOX_COLOR          = QColor(  0, 128, 255, 255)
+
+
+def draw_reference_bbox(p: QPainter, bbox: BBox, scale: float) -> None:
+    if bbox.empty():
+        return
+    pen = QPen(REF_BBOX_COLOR)
+    pen.setStyle(Qt.PenStyle.DashLine)
+    pen.setWidth(max(1, int(round(2.0 / scale))))
+    p.setPen(pen)
+    p.setBrush(Qt.BrushStyle.NoBrush)
+    p.drawRect(QRectF(bbox.x, bbox.y, bbox.w, bbox.h))
+
+
+def draw_bbox(
+        p: QPainter,
+        bbox: BBox,
+        scale: float,
+        highlighted_bbox: bool = False,
+        highlighted_pidx: Optional[int] = None
+        ) -> None:
+    point_size_base: float = 8.0
+
+    if bbox.empty():
+        return
+
+    line_path = QPainterPath()
+    line_path.moveTo(bbox.get_point(0))
+    for pidx in range(4):
+        line_path.lineTo(bbox.get_point(pidx))
+    line_path.lineTo(bbox.get_point(0))
+    if highlighted_bbox:
+        pen = QPen(BBOX_HIGHLIGHTED_COLOR)
+    else:
+        pen = QPen(BBOX_COLOR)
+    pen.setWidth(max(1, int(round(2.0 / scale))))
+    p.setPen(pen)
+    p.drawPath(line_path)
+
+    for pidx in range(4):
+        point = bbox.get_point(pidx)
+        d = point_size_base / scale
+        if pidx == highlighted_pidx:
+            d *= 1.0
+            path = QPainterPath()
+            path.addRect(point.x() - d / 2, point.y() - d / 2, d, d)
+            p.drawPath(path)
+            p.fillPath(path, POINT_HIGHLIGHTED_COLOR)
+        else:
+            d *= 1.0
+            path = QPainterPath()
+            path.addEllipse(point, d / 2.0, d / 2.0)
+            p.drawPath(path)
+            p.fillPath(path, POINT_COLOR)
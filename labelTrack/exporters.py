@@ -0,0 +1,160 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+from itertools import islice
+from itertools import zip_longest
+import json
+import multiprocessing
+import os
+import os.path as osp
+from typing import Iterator
+from typing import Optional
+from PyQt6.QtCore import QThread
+from PyQt6.QtCore import pyqtSignal
+from labelTrack.bbox import BBox
+from labelTrack.bbox import iter_label_file
+from labelTrack.imagedir import ImageDir
+from labelTrack.imagedir import sequence_names
+
+
+def iter_frames(
+        image_index: ImageDir,
+        label_file: str
+        ) -> Iterator[tuple[int, str, BBox]]:
+    bboxes = islice(iter_label_file(label_file), len(image_index))
+    for idx, (file_path, bbox) in enumerate(zip_longest(image_index.files, bboxes)):
+        yield idx, file_path, bbox if bbox is not None else BBox()
+
+
+# start is the index of the first frame in its directory, for exporting a
+# shard. frame numbers count from the start of the directory.
+
+def export_coco(image_index: ImageDir, label_file: str, out_dir: str, start: int = 0) -> None:
+    with open(osp.join(out_dir, 'annotations.json'), 'w') as f:
+        f.write('{"categories": [{"id": 1, "name": "object"}],\n"images": [')
+        for idx, file_path in enumerate(image_index.files):
+            w, h = image_index.size(idx) or (0, 0)
+            image = {
+                'id': start + idx + 1,
+                'file_name': osp.basename(file_path),
+                'width': w,
+                'height': h}
+            f.write(('\n' if idx == 0 else ',\n') + json.dumps(image))
+        f.write('],\n"annotations": [')
+        num = 0
+        for idx, _, bbox in iter_frames(image_index, label_file):
+            if bbox.empty():
+                continue
+            annotation = {
+                'id': num + 1,
+                'image_id': start + idx + 1,
+                'category_id': 1,
+                'bbox': [round(bbox.x, 2), round(bbox.y, 2), round(bbox.w, 2), round(bbox.h, 2)],
+                'area': round(bbox.w * bbox.h, 2),
+                'iscrowd': 0}
+            f.write(('\n' if num == 0 else ',\n') + json.dumps(annotation))
+            num += 1
+        f.write(']}\n')
+
+
+def export_yolo(image_index: ImageDir, label_file: str, out_dir: str, start: int = 0) -> None:
+    labels_dir = osp.join(out_dir, 'labels')
+    os.makedirs(labels_dir, exist_ok=True)
+    for idx, file_path, bbox in iter_frames(image_index, label_file):
+        stem = osp.splitext(osp.basename(file_path))[0]
+        with open(osp.join(labels_dir, f'{stem}.txt'), 'w') as f:
+            size = image_index.size(idx)
+            if bbox.empty() or size is None:
+                continue
+            w, h = size
+            f.write(f'0 {bbox.cx() / w:.6f} {bbox.cy() / h:.6f} {bbox.w / w:.6f} {bbox.h / h:.6f}\n')
+
+
+def export_mot(image_index: ImageDir, label_file: str, out_dir: str, start: int = 0) -> None:
+    gt_dir = osp.join(out_dir, 'gt')
+    os.makedirs(gt_dir, exist_ok=True)
+    with open(osp.join(gt_dir, 'gt.txt'), 'w') as f:
+        for idx, _, bbox in iter_frames(image_index, label_file):
+            if bbox.empty():
+                continue
+            f.write(f'{start + idx + 1},1,{bbox.x:.2f},{bbox.y:.2f},{bbox.w:.2f},{bbox.h:.2f},1,1,1.0\n')
+    w, h = image_index.size(0) or (0, 0)
+    with open(osp.join(out_dir, 'seqinfo.ini'), 'w') as f:
+        f.write('[Sequence]\n')
+        f.write(f'name={osp.basename(out_dir)}\n')
+        f.write(f'imDir={image_index.image_dir}\n')
+        f.write(f'seqLength={start + len(image_index)}\n')
+        f.write(f'imWidth={w}\n')
+        f.write(f'imHeight={h}\n')
+        f.write(f'imExt={osp.splitext(image_index.files[0])[1]}\n')
+
+
+EXPORTERS = {
+    'coco': export_coco,
+    'yolo': export_yolo,
+    'mot': export_mot}
+
+
+def export_sequence(
+        fmt: str,
+        image_dir: str,
+        label_file: str,
+        out_dir: str,
+        name: Optional[str] = None,
+        files: Optional[list[str]] = None,
+        start: int = 0
+        ) -> str:
+    # files given as base names export only those frames, the first of
+    # which is frame start of the directory.
+    image_index = ImageDir(image_dir, files)
+    if len(image_index) == 0:
+        raise ValueError(f'No image found in {image_dir}')
+    seq_out_dir = osp.join(out_dir, name or osp.basename(osp.normpath(image_dir)))
+    os.makedirs(seq_out_dir, exist_ok=True)
+    EXPORTERS[fmt](image_index, label_file, seq_out_dir, start)
+    image_index.save()
+    return seq_out_dir
+
+
+def export_sequences(
+        fmt: str,
+        sequences: list[tuple[str, str]],
+        out_dir: str,
+        jobs: int | None = None
+        ) -> Iterator[tuple[str, str | Exception]]:
+    names = sequence_names([image_dir for image_dir, _ in sequences])
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(export_sequence, fmt, image_dir, label_file, out_dir, names[image_dir]): image_dir
+            for image_dir, label_file in sequences}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], e
+
+
+class ExportThread(QThread):
+
+    # runs export_sequence for each job, a tuple of its arguments, in a
+    # process pool off the gui thread. workers are spawned rather than
+    # forked from the gui process. each sequence is reported with its
+    # output directory or the error that stopped it.
+
+    exported = pyqtSignal(str, object)
+
+    def __init__(self, jobs: list[tuple], parent=None) -> None:
+        super(ExportThread, self).__init__(parent)
+        self._jobs: list[tuple] = jobs
+
+    def run(self) -> None:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(mp_context=context) as executor:
+            futures = {executor.submit(export_sequence, *job): job[1] for job in self._jobs}
+            for future in as_completed(futures):
+                if self.isInterruptionRequested():
+                    executor.shutdown(cancel_futures=True)
+                    return
+                try:
+                    self.exported.emit(futures[future], future.result())
+                except Exception as e:
+                    self.exported.emit(futures[future], e)
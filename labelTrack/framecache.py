@@ -0,0 +1,100 @@
+from collections import OrderedDict
+import os
+import threading
+from typing import Optional
+from PyQt6.QtCore import QSize
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage
+from PyQt6.QtGui import QImageReader
+from labelTrack.profiling import timed
+
+
+THUMBNAIL_SIZE: int = 64
+
+
+def decode_image(file_path: str) -> QImage:
+    reader = QImageReader(file_path)
+    reader.setAutoTransform(True)
+    img = reader.read()
+    if not isinstance(img, QImage):
+        img = QImage.fromData(img)
+    return img
+
+
+def decode_thumbnail(file_path: str, size: int = THUMBNAIL_SIZE) -> QImage:
+    # the jpeg reader decodes at a reduced scale when a small size is
+    # requested, so a thumbnail costs much less than the full frame.
+    reader = QImageReader(file_path)
+    reader.setAutoTransform(True)
+    full = reader.size()
+    if full.isValid():
+        reader.setScaledSize(full.scaled(QSize(size, size), Qt.AspectRatioMode.KeepAspectRatio))
+    return reader.read()
+
+
+class FrameCache(object):
+
+    # decoded frames and thumbnails of any sequence, evicted in lru order
+    # once their total size exceeds max_bytes. an entry is dropped when its
+    # file changed size or mtime. it is filled from the preload thread too,
+    # so every access holds the lock; decoding itself does not.
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024) -> None:
+        self.max_bytes: int = max_bytes
+        self._entries: OrderedDict[tuple[str, str], tuple[Optional[tuple[int, int]], QImage]] = OrderedDict()
+        self._bytes: int = 0
+        self._lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @timed('FrameCache.image')
+    def image(self, file_path: str) -> QImage:
+        return self.__get('image', file_path, decode_image)
+
+    @timed('FrameCache.thumbnail')
+    def thumbnail(self, file_path: str) -> QImage:
+        return self.__get('thumbnail', file_path, decode_thumbnail)
+
+    def contains(self, file_path: str) -> bool:
+        with self._lock:
+            return ('image', file_path) in self._entries
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __get(self, kind: str, file_path: str, decode) -> QImage:
+        key = (kind, file_path)
+        stat = self.__file_stat(file_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == stat:
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                self.__remove(key)
+        img = decode(file_path)
+        if img.isNull():
+            return img
+        with self._lock:
+            if key in self._entries:
+                self.__remove(key)
+            self._entries[key] = (stat, img)
+            self._bytes += img.sizeInBytes()
+            while (self._bytes > self.max_bytes) and (len(self._entries) > 1):
+                self.__remove(next(iter(self._entries)))
+        return img
+
+    def __remove(self, key: tuple[str, str]) -> None:
+        _, img = self._entries.pop(key)
+        self._bytes -= img.sizeInBytes()
+
+    @staticmethod
+    def __file_stat(file_path: str) -> Optional[tuple[int, int]]:
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
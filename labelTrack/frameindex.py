@@ -0,0 +1,107 @@
+from itertools import accumulate
+from typing import Optional
+
+
+class FrameIndex(object):
+
+    # fenwick tree over the labeled state of each frame, so counting and
+    # searching for unlabeled frames stays logarithmic on long sequences.
+
+    def __init__(self) -> None:
+        self._labeled: bytearray = bytearray()
+        self._tree: list[int] = [0]
+        self._count: int = 0
+
+    def __len__(self) -> int:
+        return len(self._labeled)
+
+    def reset(self, labeled: list[bool]) -> None:
+        self._labeled = bytearray(labeled)
+        self.__build()
+
+    def update(self, indices: range | list[int], labeled: list[bool]) -> None:
+        # a bulk edit rebuilds the tree once when that is cheaper than
+        # updating it frame by frame.
+        n = len(self._labeled)
+        if len(indices) * n.bit_length() < n:
+            for idx, v in zip(indices, labeled):
+                self.set(idx, v)
+            return
+        if isinstance(indices, range) and (indices.step == 1):
+            self._labeled[indices.start:indices.stop] = bytes(labeled)
+        else:
+            for idx, v in zip(indices, labeled):
+                self._labeled[idx] = v
+        self.__build()
+
+    def append(self, labeled: list[bool]) -> None:
+        for v in labeled:
+            self._labeled.append(int(v))
+            self._count += int(v)
+            i = len(self._labeled)
+            # a new node covers (i - lowbit(i), i].
+            self._tree.append(int(v) + self.__prefix(i - 1) - self.__prefix(i - (i & -i)))
+
+    def set(self, idx: int, labeled: bool) -> None:
+        v = int(labeled)
+        d = v - self._labeled[idx]
+        if d == 0:
+            return
+        self._labeled[idx] = v
+        self._count += d
+        i = idx + 1
+        n = len(self._labeled)
+        while i <= n:
+            self._tree[i] += d
+            i += i & -i
+
+    def labeled(self, idx: int) -> bool:
+        return bool(self._labeled[idx])
+
+    def labeled_count(self) -> int:
+        return self._count
+
+    def next_unlabeled(self, idx: int) -> Optional[int]:
+        idx = max(idx, -1)
+        if idx + 1 >= len(self._labeled):
+            return None
+        k = (idx + 1) - self.__prefix(idx + 1) + 1
+        if k > len(self._labeled) - self._count:
+            return None
+        return self.__find_unlabeled(k)
+
+    def prev_unlabeled(self, idx: int) -> Optional[int]:
+        idx = min(idx, len(self._labeled))
+        k = idx - self.__prefix(idx)
+        if k <= 0:
+            return None
+        return self.__find_unlabeled(k)
+
+    def __build(self) -> None:
+        # node i covers (i - lowbit(i), i], and i - lowbit(i) == i & (i - 1).
+        prefix = [0, *accumulate(self._labeled)]
+        self._tree = [prefix[i] - prefix[i & (i - 1)] for i in range(len(prefix))]
+        self._count = prefix[-1]
+
+    def __prefix(self, i: int) -> int:
+        # number of labeled frames in [0, i).
+        s = 0
+        while i > 0:
+            s += self._tree[i]
+            i -= i & -i
+        return s
+
+    def __find_unlabeled(self, k: int) -> int:
+        # index of the k-th (1-based) unlabeled frame.
+        n = len(self._labeled)
+        pos = 0
+        bit = 1 << (n.bit_length() - 1) if n > 0 else 0
+        while bit > 0:
+            nxt = pos + bit
+            if nxt <= n:
+                zeros = bit - self._tree[nxt]
+                if zeros < k:
+                    pos = nxt
+                    k -= zeros
+            bit >>= 1
+        return pos
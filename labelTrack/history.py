@@ -0,0 +1,148 @@
+from array import array
+from collections import deque
+from itertools import starmap
+from math import nan
+from typing import Optional
+from labelTrack.bbox import BBox
+
+
+class Edit(object):
+
+    # one undoable change of bboxes. indices is a range for whole-range
+    # operations, so that it takes constant space, and the bboxes are
+    # packed as 4 doubles each. a uniform edit sets every frame to one
+    # bbox and stores it once.
+
+    __slots__ = ('indices', 'old', 'new', 'uniform')
+
+    def __init__(self, indices: range | array, old: array, new: array, uniform: bool) -> None:
+        self.indices: range | array = indices
+        self.old: array = old
+        self.new: array = new
+        self.uniform: bool = uniform
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def nbytes(self) -> int:
+        size = 128 + (len(self.old) + len(self.new)) * 8
+        if isinstance(self.indices, array):
+            size += len(self.indices) * self.indices.itemsize
+        return size
+
+    def old_bboxes(self) -> list[BBox]:
+        return unpack_bboxes(self.old)
+
+    def new_bboxes(self) -> list[BBox]:
+        bboxes = unpack_bboxes(self.new)
+        if self.uniform:
+            return [BBox(b.x, b.y, b.w, b.h) for b in bboxes for _ in self.indices]
+        return bboxes
+
+
+def pack_bboxes(bboxes: list[BBox]) -> array:
+    values = array('d')
+    for b in bboxes:
+        values.extend((
+            nan if b.x is None else b.x,
+            nan if b.y is None else b.y,
+            nan if b.w is None else b.w,
+            nan if b.h is None else b.h))
+    return values
+
+
+def unpack_bboxes(values: array) -> list[BBox]:
+    it = iter(values)
+    # the sum of finite values is finite, so most edits skip the nan checks.
+    if sum(values) == sum(values):
+        return list(starmap(BBox, zip(it, it, it, it)))
+    # nan is the only value not equal to itself.
+    return [
+        BBox(x if x == x else None, y if y == y else None, w if w == w else None, h if h == h else None)
+        for x, y, w, h in zip(it, it, it, it)]
+
+
+def pack_indices(indices: list[int]) -> range | array:
+    num = len(indices)
+    if (num > 0) and (indices[-1] - indices[0] == num - 1):
+        return range(indices[0], indices[-1] + 1)
+    return array('q', indices)
+
+
+class History(object):
+
+    # undo and redo stacks of edits, together bounded by max_bytes by
+    # dropping the oldest edits. while a group is open, the edits of one
+    # frame are coalesced into the first, so a drag is undone in one step.
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_bytes: int = max_bytes
+        self._undo: deque[Edit] = deque()
+        self._redo: list[Edit] = []
+        self._bytes: int = 0
+        self._grouping: bool = False
+        self._group: Optional[Edit] = None
+
+    def clear(self) -> None:
+        self._undo = deque()
+        self._redo = []
+        self._bytes = 0
+        self._group = None
+
+    def can_undo(self) -> bool:
+        return len(self._undo) > 0
+
+    def can_redo(self) -> bool:
+        return len(self._redo) > 0
+
+    def begin_group(self) -> None:
+        self._grouping = True
+        self._group = None
+
+    def end_group(self) -> None:
+        self._grouping = False
+        self._group = None
+
+    def drop_group(self) -> None:
+        # forgets the edit of the open group, which did not take effect.
+        group = self._group
+        if (group is not None) and (len(self._undo) > 0) and (self._undo[-1] is group):
+            self._undo.pop()
+            self._bytes -= group.nbytes()
+        self._group = None
+
+    def record(self, indices: list[int] | range, old: list[BBox], new: list[BBox] | BBox) -> None:
+        uniform = isinstance(new, BBox)
+        if isinstance(indices, list):
+            indices = pack_indices(indices)
+        if self._grouping and (len(indices) == 1) and not uniform:
+            group = self._group
+            if (group is not None) and \
+               (len(self._undo) > 0) and (self._undo[-1] is group) and \
+               (group.indices[0] == indices[0]):
+                group.new = pack_bboxes(new)
+                return
+        edit = Edit(indices, pack_bboxes(old), pack_bboxes([new] if uniform else new), uniform)
+        if self._grouping:
+            self._group = edit
+        self._bytes -= sum(e.nbytes() for e in self._redo)
+        self._redo = []
+        self._undo.append(edit)
+        self._bytes += edit.nbytes()
+        while (self._bytes > self.max_bytes) and (len(self._undo) > 1):
+            self._bytes -= self._undo.popleft().nbytes()
+
+    def undo(self) -> Optional[Edit]:
+        if len(self._undo) == 0:
+            return None
+        edit = self._undo.pop()
+        self._redo.append(edit)
+        self._group = None
+        return edit
+
+    def redo(self) -> Optional[Edit]:
+        if len(self._redo) == 0:
+            return None
+        edit = self._redo.pop()
+        self._undo.append(edit)
+        return edit
@@ -0,0 +1,315 @@
+import hashlib
+import json
+import os
+import os.path as osp
+import re
+import struct
+from typing import Optional
+from PyQt6.QtGui import QImageIOHandler
+from PyQt6.QtGui import QImageReader
+from labelTrack.defines import CACHE_DIR
+from labelTrack.profiling import timed
+
+
+MANIFEST_VERSION: int = 1
+
+
+def natural_sort(list: list[str], key = lambda s:s):
+    def get_alphanum_key_func(key):
+        convert = lambda text: int(text) if text.isdigit() else text
+        return lambda s: [convert(c) for c in re.split('([0-9]+)', key(s))]
+    sort_key = get_alphanum_key_func(key)
+    list.sort(key=sort_key)
+
+
+def image_extensions() -> tuple[str]:
+    return tuple(
+        '.{}'.format(fmt.data().decode('ascii').lower())
+        for fmt in QImageReader.supportedImageFormats())
+
+
+@timed('scan_all_images')
+def scan_all_images(folder_path):
+    extensions = image_extensions()
+    images = []
+    for root, dirs, files in os.walk(folder_path):
+        for file in files:
+            if file.lower().endswith(extensions):
+                images.append(osp.abspath(osp.join(root, file)))
+        break
+    natural_sort(images, key=lambda x: x.lower())
+    return images
+
+
+def sequence_names(image_dirs: list[str]) -> dict[str, str]:
+    # output names of sequences written side by side. the base name is kept
+    # unless it is shared, like the img dirs of otb or lasot, in which case
+    # the path below the common root is used.
+    paths = {image_dir: osp.normpath(osp.abspath(image_dir)) for image_dir in image_dirs}
+    basenames = [osp.basename(path) for path in paths.values()]
+    if len(set(basenames)) == len(basenames):
+        return {image_dir: osp.basename(path) for image_dir, path in paths.items()}
+    root = osp.commonpath(list(paths.values()))
+    return {
+        image_dir: osp.relpath(path, osp.dirname(root) if path == root else root).replace(os.sep, '_')
+        for image_dir, path in paths.items()}
+
+
+def read_image_size(file_path: str) -> Optional[tuple[int, int]]:
+    try:
+        with open(file_path, 'rb') as f:
+            size = _read_header_size(f)
+    except (OSError, struct.error, ValueError):
+        size = None
+    if size is not None:
+        return size
+    reader = QImageReader(file_path)
+    reader.setAutoTransform(True)
+    qsize = reader.size()
+    if not qsize.isValid():
+        return None
+    w, h = qsize.width(), qsize.height()
+    if reader.transformation() & QImageIOHandler.Transformation.TransformationRotate90:
+        w, h = h, w
+    return w, h
+
+
+def _read_header_size(f) -> Optional[tuple[int, int]]:
+    head = f.read(32)
+    if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+        return struct.unpack('>II', head[16:24])
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return struct.unpack('<HH', head[6:10])
+    if head.startswith(b'BM'):
+        w, h = struct.unpack('<ii', head[18:26])
+        return abs(w), abs(h)
+    if head.startswith(b'RIFF') and head[8:12] == b'WEBP':
+        return _read_webp_size(head)
+    if head.startswith(b'\xff\xd8'):
+        f.seek(2)
+        return _read_jpeg_size(f)
+    return None
+
+
+def _read_webp_size(head: bytes) -> Optional[tuple[int, int]]:
+    chunk = head[12:16]
+    if chunk == b'VP8 ':
+        w, h = struct.unpack('<HH', head[26:30])
+        return w & 0x3fff, h & 0x3fff
+    if chunk == b'VP8L':
+        b = head[21:25]
+        w = 1 + (((b[1] & 0x3f) << 8) | b[0])
+        h = 1 + (((b[3] & 0x0f) << 10) | (b[2] << 2) | ((b[1] & 0xc0) >> 6))
+        return w, h
+    if chunk == b'VP8X':
+        w = 1 + int.from_bytes(head[24:27], 'little')
+        h = 1 + int.from_bytes(head[27:30], 'little')
+        return w, h
+    return None
+
+
+def _read_jpeg_size(f) -> Optional[tuple[int, int]]:
+    # walks the marker segments up to the first SOFn, honoring the exif
+    # orientation because frames are loaded with auto transform.
+    orientation = 1
+    while True:
+        b = f.read(1)
+        while b and b != b'\xff':
+            b = f.read(1)
+        while b == b'\xff':
+            b = f.read(1)
+        if not b:
+            return None
+        marker = b[0]
+        if marker in (0xd8, 0x01) or 0xd0 <= marker <= 0xd7:
+            continue
+        if marker == 0xd9:
+            return None
+        length, = struct.unpack('>H', f.read(2))
+        if (0xc0 <= marker <= 0xcf) and marker not in (0xc4, 0xc8, 0xcc):
+            h, w = struct.unpack('>xHH', f.read(5))
+            if orientation >= 5:
+                w, h = h, w
+            return w, h
+        data = f.read(length - 2)
+        if marker == 0xe1 and data.startswith(b'Exif\x00\x00'):
+            orientation = _read_exif_orientation(data[6:])
+
+
+def _read_exif_orientation(tiff: bytes) -> int:
+    try:
+        endian = {b'II': '<', b'MM': '>'}[tiff[:2]]
+        offset, = struct.unpack(endian + 'I', tiff[4:8])
+        num, = struct.unpack(endian + 'H', tiff[offset:offset + 2])
+        for i in range(num):
+            entry = tiff[offset + 2 + 12 * i:offset + 14 + 12 * i]
+            tag, _, _, value = struct.unpack(endian + 'HHIH', entry[:10])
+            if tag == 0x0112:
+                return value
+    except (KeyError, struct.error):
+        pass
+    return 1
+
+
+class ImageDir(object):
+
+    # per-file fields cached in the manifest next to the listing. a cached
+    # value is kept as long as the size and mtime of its file are unchanged.
+    FIELDS: tuple[str] = ('sizes', 'hashes', 'valid')
+
+    def __init__(self, image_dir: str, files: Optional[list[str]] = None) -> None:
+        # files given as base names restrict the index to them, without
+        # listing the directory.
+        self.image_dir: str = osp.abspath(image_dir)
+        self.files: list[str] = []
+        self._listed_files: Optional[list[str]] = files
+        self._fields: dict[str, list] = {field: [] for field in self.FIELDS}
+        self._stats: list[Optional[tuple[int, int]]] = []
+        self._dirty: bool = False
+        self.__load()
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def size(self, idx: int) -> Optional[tuple[int, int]]:
+        if self._fields['sizes'][idx] is None:
+            self.__read_size(idx)
+        return self._fields['sizes'][idx]
+
+    def sizes(self) -> list[Optional[tuple[int, int]]]:
+        sizes = self._fields['sizes']
+        for idx in range(len(self.files)):
+            if sizes[idx] is None:
+                self.__read_size(idx)
+        return sizes
+
+    def hashes(self) -> list[Optional[int]]:
+        return self._fields['hashes']
+
+    def set_hash(self, idx: int, h: Optional[int]) -> None:
+        self.__set(idx, 'hashes', h)
+
+    def valid(self) -> list[Optional[bool]]:
+        return self._fields['valid']
+
+    def set_valid(self, idx: int, ok: bool) -> None:
+        self.__set(idx, 'valid', ok)
+
+    def append(self, files: list[str]) -> None:
+        self.files.extend(files)
+        for values in self._fields.values():
+            values.extend([None] * len(files))
+        self._stats.extend([None] * len(files))
+        if self._listed_files is not None:
+            self._listed_files.extend(osp.basename(f) for f in files)
+        self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        data = {
+            'version': MANIFEST_VERSION,
+            'image_dir': self.image_dir,
+            'mtime': self.__dir_mtime(),
+            'files': [osp.basename(f) for f in self.files],
+            'stats': self._stats}
+        data.update(self._fields)
+        tmp_path = self.manifest_path() + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.manifest_path())
+        self._dirty = False
+
+    def manifest_path(self) -> str:
+        key = self.image_dir
+        if self._listed_files is not None:
+            first = self._listed_files[0] if len(self._listed_files) > 0 else ''
+            key += f'\0{first}\0{len(self._listed_files)}'
+        key = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return osp.join(CACHE_DIR, f'{key}.json')
+
+    @timed('ImageDir.load')
+    def __load(self) -> None:
+        data = None
+        if osp.exists(self.manifest_path()):
+            try:
+                with open(self.manifest_path(), 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = None
+        if (data is not None) and \
+           (data.get('version') != MANIFEST_VERSION or data.get('image_dir') != self.image_dir):
+            data = None
+        mtime = self.__dir_mtime()
+        if (data is not None) and \
+           (((self._listed_files is None) and (mtime is not None) and (data.get('mtime') == mtime)) or
+            ((self._listed_files is not None) and (data.get('files') == self._listed_files))):
+            num = len(data['files'])
+            self.files = [osp.join(self.image_dir, f) for f in data['files']]
+            self._stats = [tuple(s) if s is not None else None for s in data['stats']]
+            for field in self.FIELDS:
+                self._fields[field] = [self.__decode(v) for v in data.get(field, [None] * num)]
+            # the listing is unchanged, but a file rewritten in place leaves
+            # the directory mtime alone, so every cached entry is checked.
+            for idx, stat in enumerate(self._stats):
+                if (stat is not None) and (stat != self.__file_stat(self.files[idx])):
+                    self._stats[idx] = None
+                    for field in self.FIELDS:
+                        self._fields[field][idx] = None
+                    self._dirty = True
+            return
+        if self._listed_files is None:
+            self.files = scan_all_images(self.image_dir)
+        else:
+            self.files = [osp.join(self.image_dir, f) for f in self._listed_files]
+        num = len(self.files)
+        self._stats = [None] * num
+        for field in self.FIELDS:
+            self._fields[field] = [None] * num
+        self._dirty = True
+        if data is None:
+            return
+        # the listing changed, keep the entries of unmodified files.
+        cached = {
+            f: idx for idx, (f, stat) in enumerate(zip(data['files'], data['stats']))
+            if stat is not None}
+        for idx, file_path in enumerate(self.files):
+            i = cached.get(osp.basename(file_path))
+            if i is None:
+                continue
+            stat = tuple(data['stats'][i])
+            if stat != self.__file_stat(file_path):
+                continue
+            self._stats[idx] = stat
+            for field in self.FIELDS:
+                if field in data:
+                    self._fields[field][idx] = self.__decode(data[field][i])
+
+    def __set(self, idx: int, field: str, value) -> None:
+        self._fields[field][idx] = value
+        if self._stats[idx] is None:
+            self._stats[idx] = self.__file_stat(self.files[idx])
+        self._dirty = True
+
+    def __read_size(self, idx: int) -> None:
+        self.__set(idx, 'sizes', read_image_size(self.files[idx]))
+
+    def __dir_mtime(self) -> Optional[int]:
+        # a missing directory lists no files.
+        try:
+            return os.stat(self.image_dir).st_mtime_ns
+        except OSError:
+            return None
+
+    @staticmethod
+    def __decode(value):
+        return tuple(value) if isinstance(value, list) else value
+
+    @staticmethod
+    def __file_stat(file_path: str) -> Optional[tuple[int, int]]:
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
@@ -0,0 +1,59 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from PyQt6.QtCore import QThread
+from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtGui import QImage
+
+
+CHECK_CHUNK_SIZE: int = 16
+TRAILER_BYTES: int = 64 * 1024
+
+
+def check_image(file_path: str) -> bool:
+    # a truncated jpeg or png still decodes into a partly gray frame, so the
+    # end of the stream is looked for before decoding the whole frame. some
+    # writers append bytes after it, so it is searched near the end.
+    try:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return False
+    tail = data[-TRAILER_BYTES:]
+    if data.startswith(b'\xff\xd8'):
+        if b'\xff\xd9' not in tail:
+            return False
+    elif data.startswith(b'\x89PNG\r\n\x1a\n'):
+        if b'IEND\xaeB`\x82' not in tail:
+            return False
+    elif data[:6] in (b'GIF87a', b'GIF89a'):
+        if b';' not in tail:
+            return False
+    return not QImage.fromData(data).isNull()
+
+
+class CheckThread(QThread):
+
+    # checks that frames are complete and decodable in a process pool off
+    # the gui thread. workers are spawned rather than forked from the gui
+    # process.
+
+    checked = pyqtSignal(list)
+    progress = pyqtSignal(int, int)
+
+    def __init__(self, files: list[tuple[int, str]], parent=None) -> None:
+        super(CheckThread, self).__init__(parent)
+        self._files: list[tuple[int, str]] = files
+
+    def run(self) -> None:
+        num = len(self._files)
+        done = 0
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(mp_context=context) as executor:
+            for start in range(0, num, CHECK_CHUNK_SIZE * 4):
+                if self.isInterruptionRequested():
+                    break
+                chunk = self._files[start:start + CHECK_CHUNK_SIZE * 4]
+                results = executor.map(check_image, [f for _, f in chunk], chunksize=CHECK_CHUNK_SIZE)
+                self.checked.emit([(idx, ok) for (idx, _), ok in zip(chunk, results)])
+                done += len(chunk)
+                self.progress.emit(done, num)
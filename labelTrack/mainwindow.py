@@ -1,11 +1,7 @@
 import copy
-from dataclasses import dataclass
 from functools import partial
 from math import sqrt
-from typing import Self
-import os
 import os.path as osp
-import re
 import sys
 from typing import Callable
 from typing import Optional
@@ -16,99 +12,57 @@ from PyQt6.QtWidgets import QMessageBox as QMB
 from labelTrack.__init__ import __appname__, __version__
 from labelTrack.settings import settings
 from labelTrack.defines import *
-
-
-BBOX_COLOR              = QColor(  0, 255,   0, 128)
-BBOX_HIGHLIGHTED_COLOR  = QColor(255,   0,   0, 255)
-POINT_COLOR             = QColor(  0, 255,   0, 255)
-POINT_HIGHLIGHTED_COLOR = QColor(255,   0,   0, 255)
-
-
-@dataclass
-class BBox:
-    x: Optional[float] = None
-    y: Optional[float] = None
-    w: Optional[float] = None
-    h: Optional[float] = None
-
-    def empty(self) -> bool:
-        return (self.x is None) or \
-               (self.y is None) or \
-               (self.w is None) or \
-               (self.h is None) or \
-               (self.x < 0.0 and
-                self.y < 0.0 and
-                self.w < 0.0 and
-                self.h < 0.0)
-
-    def xmin(self) -> float:
-        return self.x
-
-    def ymin(self) -> float:
-        return self.y
-
-    def xmax(self) -> float:
-        return self.x + self.w
-
-    def ymax(self) -> float:
-        return self.y + self.h
-
-    def cx(self) -> float:
-        return self.x + self.w / 2.0
-
-    def cy(self) -> float:
-        return self.y + self.h / 2.0
-
-    def move(self, dx: float, dy: float) -> None:
-        self.x += dx
-        self.y += dy
-
-    def get_xy(self, idx: int) -> tuple[float, float]:
-        if idx == 0:
-            return self.x, self.y
-        if idx == 1:
-            return self.x + self.w, self.y
-        if idx == 2:
-            return self.x + self.w, self.y + self.h
-        if idx == 3:
-            return self.x, self.y + self.h
-        raise IndexError()
-
-    def set_xy(self, pidx: int, x: float, y: float) -> None:
-        if not (0 <= pidx < 4):
-            raise IndexError()
-        x1, y1 = x, y
-        x2, y2 = self.get_xy((pidx + 2) % 4)
-        self.x = min(x1, x2)
-        self.y = min(y1, y2)
-        self.w = abs(x2 - x1)
-        self.h = abs(y2 - y1)
-
-    def get_point(self, idx: int) -> QPointF:
-        x, y = self.get_xy(idx)
-        return QPointF(x, y)
-
-    def __str__(self) -> str:
-        if self.empty():
-            return '-1.00,-1.00,-1.00,-1.00'
-        return f'{self.x:.2f},{self.y:.2f},{self.w:.2f},{self.h:.2f}'
-
-    @classmethod
-    def from_xmin_ymin_xmax_ymax(
-            cls: Self,
-            xmin: float, ymin: float,
-            xmax: float, ymax: float) -> Self:
-        return cls(x=xmin,
-                   y=ymin,
-                   w=xmax - xmin,
-                   h=ymax - ymin)
+from labelTrack.agreement import Agreement
+from labelTrack.bbox import BBox
+from labelTrack.bbox import clip
+from labelTrack.bbox import in_image
+from labelTrack.bbox import intersection
+from labelTrack.bbox import iter_label_file
+from labelTrack.bbox import out_of_image
+from labelTrack.bbox import write_label_file
+from labelTrack.client import EventThread
+from labelTrack.client import RemoteImageDir
+from labelTrack.client import ServerClient
+from labelTrack.client import ServerError
+from labelTrack.drawing import BBOX_COLOR
+from labelTrack.drawing import BBOX_HIGHLIGHTED_COLOR
+from labelTrack.drawing import draw_bbox
+from labelTrack.drawing import draw_reference_bbox
+from labelTrack.exporters import EXPORTERS
+from labelTrack.exporters import ExportThread
+from labelTrack.framecache import FrameCache
+from labelTrack.frameindex import FrameIndex
+from labelTrack.history import Edit
+from labelTrack.history import History
+from labelTrack.imagedir import ImageDir
+from labelTrack.imagedir import sequence_names
+from labelTrack.integrity import CheckThread
+from labelTrack.mirror import Mirror
+from labelTrack.mirror import MirrorThread
+from labelTrack.outliers import MotionOutliers
+from labelTrack.phash import DuplicateRuns
+from labelTrack.phash import HashThread
+from labelTrack import profiling
+from labelTrack.profiling import timed
+from labelTrack.shards import Shard
+from labelTrack.watcher import DirectoryFollower
+from labelTrack.workspace import PreloadThread
+from labelTrack.workspace import Workspace
+
+
+# edits of more frames refresh the image list at once.
+BULK_REFRESH_SIZE: int = 1000
 
 
 class MainWindow(QMainWindow):
 
     def __init__(self,
                  image_dir: Optional[str] = None,
-                 label_file: Optional[str] = None
+                 label_file: Optional[str] = None,
+                 shard_file: Optional[str] = None,
+                 follow: bool = False,
+                 workspace_file: Optional[str] = None,
+                 server: Optional[str] = None
                  ) -> None:
         super(MainWindow, self).__init__()
         self.setWindowTitle(__appname__)
@@ -116,19 +70,87 @@ class MainWindow(QMainWindow):
         self._image_dir: Optional[str] = None
         self._image_dir_prev_opened: Optional[str] = settings.get('image_dir', None)
         self._image_files: list[str] = []
+        self._image_index: Optional[ImageDir] = None
+        self._follower: Optional[DirectoryFollower] = None
+        self._shard_open: bool = False
+        self._shard: Optional[Shard] = None
+        self._shard_file: Optional[str] = None
         self._label_file: Optional[str] = None
         self._label_file_prev_opened: Optional[str] = settings.get('label_path', None)
         self._bboxes: list[BBox] = []
+        self._outliers: MotionOutliers = MotionOutliers(
+            min_iou=settings.get(SETTINGS_KEY_OUTLIER_MIN_IOU, 0.5),
+            max_velocity=settings.get(SETTINGS_KEY_OUTLIER_MAX_VELOCITY, 0.5),
+            max_scale=settings.get(SETTINGS_KEY_OUTLIER_MAX_SCALE, 1.5))
+        self._frame_index: FrameIndex = FrameIndex()
+        # rows out of view whose text is refreshed once they are scrolled to.
+        self._stale_items: set[int] = set()
+        self._ref_label_file: Optional[str] = None
+        self._ref_bboxes: list[BBox] = []
+        self._agreement: Optional[Agreement] = None
+        self._worst_frames: Optional[list[int]] = []
+        self._worst_rank: int = -1
+        self._duplicate_runs: DuplicateRuns = DuplicateRuns()
+        self._hash_thread: Optional[HashThread] = None
+        self._check_thread: Optional[CheckThread] = None
+        self._mirror: Optional[Mirror] = None
+        self._mirror_thread: Optional[MirrorThread] = None
+        self._frame_cache: FrameCache = FrameCache(
+            max_bytes=settings.get(SETTINGS_KEY_FRAME_CACHE_MB, 512) * 1024 * 1024)
+        self._workspace: Optional[Workspace] = None
+        self._workspace_file: Optional[str] = None
+        self._workspace_idx: int = -1
+        self._preloaded: dict[str, ImageDir] = {}
+        self._preload_failed: set[str] = set()
+        self._preload_thread: Optional[PreloadThread] = None
+        self._export_thread: Optional[ExportThread] = None
+        self._export_results: list[tuple[str, object]] = []
+        self._client: Optional[ServerClient] = ServerClient(server) if server is not None else None
+        self._event_thread: Optional[EventThread] = None
+        # edits made while dragging on the canvas, sent to the server on
+        # release with the bboxes they replaced.
+        self._remote_edits: Optional[dict[int, BBox]] = None
+        self._remote_old: dict[int, BBox] = {}
+        self._history: History = History(
+            max_bytes=settings.get(SETTINGS_KEY_HISTORY_MB, 64) * 1024 * 1024)
         self._dirty: bool = False
 
         self.img_list = QListWidget()
+        self.img_list.setUniformItemSizes(True)
         self.img_list.currentItemChanged.connect(self.file_current_item_changed)
+        self.img_list.verticalScrollBar().valueChanged.connect(self.__refresh_visible_items)
+        self.img_list.verticalScrollBar().rangeChanged.connect(self.__refresh_visible_items)
         self.file_dock = QDockWidget('Image List', self)
         self.file_dock.setObjectName('images')
         self.file_dock.setWidget(self.img_list)
         self.file_dock.setFeatures(QDockWidget.DockWidgetFeature.DockWidgetFloatable)
         self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.file_dock)
 
+        self.seq_list = QListWidget()
+        self.seq_list.setUniformItemSizes(True)
+        self.seq_list.setIconSize(QSize(32, 32))
+        self.seq_list.currentRowChanged.connect(self.__open_sequence)
+        self.seq_dock = QDockWidget('Sequences', self)
+        self.seq_dock.setObjectName('sequences')
+        self.seq_dock.setWidget(self.seq_list)
+        self.seq_dock.setFeatures(QDockWidget.DockWidgetFeature.DockWidgetFloatable)
+        self.addDockWidget(Qt.DockWidgetArea.LeftDockWidgetArea, self.seq_dock)
+        self.seq_dock.hide()
+
+        self.timing_table = QTableWidget(0, 5)
+        self.timing_table.setHorizontalHeaderLabels(['Span', 'Count', 'p50 ms', 'p95 ms', 'Max ms'])
+        self.timing_table.verticalHeader().hide()
+        self.timing_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.timing_dock = QDockWidget('Timings', self)
+        self.timing_dock.setObjectName('timings')
+        self.timing_dock.setWidget(self.timing_table)
+        self.timing_dock.setFeatures(QDockWidget.DockWidgetFeature.DockWidgetFloatable)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.timing_dock)
+        self.timing_dock.hide()
+        self.timing_timer = QTimer(self)
+        self.timing_timer.setInterval(1000)
+        self.timing_timer.timeout.connect(self.__update_timings)
+
         self.canvas = Canvas(parent=self)
         self.scroll_area = QScrollArea()
         self.scroll_area.setWidget(self.canvas)
@@ -141,15 +163,41 @@ class MainWindow(QMainWindow):
         self.quit_action = self.__new_action('Quit', icon_file='quit', slot=self.close, shortcut='Ctrl+Q')
         self.open_image_dir_action = self.__new_action('Open Image', icon_file='open', slot=self.__open_image_dir_dialog)
         self.open_label_file_action = self.__new_action('Open Label', icon_file='open', slot=self.__open_label_file_dialog)
+        self.open_shard_action = self.__new_action('Open Shard', icon_file='open', slot=self.__open_shard_dialog)
+        self.open_workspace_action = self.__new_action('Open Workspace', icon_file='open', slot=self.__open_workspace_dialog)
+        self.next_sequence_action = self.__new_action('Next Sequence', icon_file='next', slot=self.__open_next_sequence, shortcut='n')
+        self.mark_done_action = self.__new_action('Mark Sequence Done', icon_file='done', slot=self.__mark_sequence_done, shortcut='Ctrl+D')
         self.next_image_action = self.__new_action('Next Image', icon_file='next', slot=self.__open_next_image, shortcut='d')
         self.prev_image_action = self.__new_action('Previous Image', icon_file='prev', slot=self.__open_prev_image, shortcut='a')
+        self.next_unlabeled_action = self.__new_action('Next Unlabeled Image', icon_file='next', slot=self.__open_next_unlabeled_image, shortcut='e')
+        self.prev_unlabeled_action = self.__new_action('Previous Unlabeled Image', icon_file='prev', slot=self.__open_prev_unlabeled_image, shortcut='q')
+        self.next_suspicious_action = self.__new_action('Next Suspicious Image', icon_file='verify', slot=self.__open_next_suspicious_image, shortcut='s')
         self.save_action = self.__new_action('Save', icon_file='save', slot=self.__save_label_file, shortcut='Ctrl+s')
+        self.open_ref_label_file_action = self.__new_action('Open Reference Label', icon_file='open', slot=self.__open_ref_label_file_dialog)
+        self.next_worst_action = self.__new_action('Next Worst Agreement Image', icon_file='verify', slot=self.__open_next_worst_image, shortcut='x')
+        self.export_action = self.__new_action('Export', icon_file='save-as', slot=self.__export_dialog)
+        self.export_workspace_action = self.__new_action('Export Workspace', icon_file='save-as', slot=self.__export_workspace_dialog)
         self.create_bbox_action = self.__new_action('Create BBox', icon_file='objects', slot=self.__create_bbox, shortcut='w')
         self.delete_bbox_action = self.__new_action('Delete BBox', icon_file='close', slot=self.__delete_bbox, shortcut='c')
+        self.undo_action = self.__new_action('Undo', icon_file='undo', slot=self.__undo, shortcut='Ctrl+Z')
+        self.redo_action = self.__new_action('Redo', icon_file='undo', slot=self.__redo, shortcut='Ctrl+Y')
         self.next_image_and_copy_action = self.__new_action('Next Image and Copy', icon_file='next', slot=self.__next_image_and_copy, shortcut='r')
         self.copy_bbox_action = self.__new_action('Copy BBox', icon_file='copy', slot=self.__copy_bbox, shortcut='t')
+        self.clip_bboxes_action = self.__new_action('Clip BBoxes to Images', icon_file='fit', slot=self.__clip_bboxes)
+        self.detect_duplicates_action = self.__new_action('Detect Duplicate Frames', icon_file='verify', slot=self.__detect_duplicates)
+        self.check_frames_action = self.__new_action('Check Frames', icon_file='verify', slot=self.__check_frames)
+        self.apply_to_run_action = self.__new_action('Apply BBox to Duplicate Run', icon_file='copy', slot=self.__apply_bbox_to_run, shortcut='g')
         self.show_info_action = self.__new_action('info', icon_file='help', slot=self.__show_info_dialog)
         self.auto_saving_action = self.__new_action('Auto Save Mode', checkable=True, checked=settings.get(SETTINGS_KEY_AUTO_SAVE, False))
+        self.unlabeled_only_action = self.__new_action('Show Unlabeled Only', slot=self.__filter_img_list, checkable=True)
+        self.follow_action = self.__new_action('Follow New Images', slot=self.__follow_changed, checkable=True, checked=follow)
+        self.mirror_action = self.__new_action('Mirror Frames Locally', slot=self.__mirror_changed, checkable=True, checked=settings.get(SETTINGS_KEY_MIRROR, False))
+        self.skip_duplicates_action = self.__new_action('Skip Duplicate Runs', checkable=True)
+        self.check_on_open_action = self.__new_action('Check Frames on Open', checkable=True, checked=settings.get(SETTINGS_KEY_CHECK_FRAMES, False))
+        self.skip_unreadable_action = self.__new_action('Skip Unreadable Frames', checkable=True)
+        self.record_timings_action = self.__new_action('Record Timings', slot=self.__record_timings_changed, checkable=True, checked=profiling.enabled())
+        self.reset_timings_action = self.__new_action('Reset Timings', slot=self.__reset_timings)
+        self.export_trace_action = self.__new_action('Export Timing Trace', icon_file='save-as', slot=self.__export_trace_dialog)
         self.zoom_spinbox = QSpinBox()
         self.zoom_spinbox.setButtonSymbols(QAbstractSpinBox.ButtonSymbols.NoButtons)
         self.zoom_spinbox.setRange(1, 500)
@@ -164,6 +212,7 @@ class MainWindow(QMainWindow):
         self.zoom_out_action = self.__new_action('Zoom Out', icon_file='zoom-out', slot=partial(self.__add_zoom, -10), shortcut='Ctrl+-')
         self.zoom_org_action = self.__new_action('Original Size', icon_file='zoom', slot=self.__reset_zoom, shortcut='Ctrl+=')
         self.fit_window_action = self.__new_action('Fit Window', icon_file='fit-window', slot=self.__set_fit_window, shortcut='Ctrl+F')
+        self.loupe_action = self.__new_action('Show Magnifier', icon_file='zoom', slot=self.canvas.update, shortcut='m', checkable=True, checked=settings.get(SETTINGS_KEY_LOUPE, False))
         self.light_brighten_action = self.__new_action('Light Brighten', icon_file='light_lighten', slot=partial(self.__add_light, 10), shortcut='Ctrl+Shift++')
         self.light_darken_action = self.__new_action('Light Darken', icon_file='light_darken', slot=partial(self.__add_light, -10), shortcut='Ctrl+Shift+-')
         self.light_org_action = self.__new_action('Light Reset', icon_file='light_reset', slot=partial(self.__set_light, 50), shortcut='Ctrl+Shift+=', checkable=True, checked=True)
@@ -183,21 +232,48 @@ class MainWindow(QMainWindow):
         self.menus_help = self.menuBar().addMenu('Help')
         self.menus_file.addAction(self.open_image_dir_action)
         self.menus_file.addAction(self.open_label_file_action)
+        self.menus_file.addAction(self.open_shard_action)
+        self.menus_file.addAction(self.open_workspace_action)
+        self.menus_file.addAction(self.open_ref_label_file_action)
         self.menus_file.addAction(self.save_action)
+        self.menus_file.addAction(self.export_action)
+        self.menus_file.addAction(self.export_workspace_action)
+        self.menus_file.addAction(self.export_trace_action)
         self.menus_file.addAction(self.next_image_action)
         self.menus_file.addAction(self.prev_image_action)
+        self.menus_file.addAction(self.next_unlabeled_action)
+        self.menus_file.addAction(self.prev_unlabeled_action)
+        self.menus_file.addAction(self.next_suspicious_action)
+        self.menus_file.addAction(self.next_worst_action)
+        self.menus_file.addAction(self.next_sequence_action)
+        self.menus_file.addAction(self.mark_done_action)
         self.menus_file.addAction(self.quit_action)
+        self.menus_edit.addAction(self.undo_action)
+        self.menus_edit.addAction(self.redo_action)
         self.menus_edit.addAction(self.create_bbox_action)
         self.menus_edit.addAction(self.delete_bbox_action)
         self.menus_edit.addAction(self.next_image_and_copy_action)
         self.menus_edit.addAction(self.copy_bbox_action)
+        self.menus_edit.addAction(self.clip_bboxes_action)
+        self.menus_edit.addAction(self.detect_duplicates_action)
+        self.menus_edit.addAction(self.apply_to_run_action)
+        self.menus_edit.addAction(self.check_frames_action)
         self.menus_view.addAction(self.auto_saving_action)
+        self.menus_view.addAction(self.unlabeled_only_action)
+        self.menus_view.addAction(self.follow_action)
+        self.menus_view.addAction(self.mirror_action)
+        self.menus_view.addAction(self.skip_duplicates_action)
+        self.menus_view.addAction(self.check_on_open_action)
+        self.menus_view.addAction(self.skip_unreadable_action)
+        self.menus_view.addAction(self.record_timings_action)
+        self.menus_view.addAction(self.reset_timings_action)
         self.menus_view.addSeparator()
         self.menus_view.addAction(self.zoom_in_action)
         self.menus_view.addAction(self.zoom_out_action)
         self.menus_view.addAction(self.zoom_org_action)
         self.menus_view.addSeparator()
         self.menus_view.addAction(self.fit_window_action)
+        self.menus_view.addAction(self.loupe_action)
         self.menus_help.addAction(self.show_info_action)
         self.toolbar = ToolBar('Tools')
         self.toolbar.setToolButtonStyle(Qt.ToolButtonStyle.ToolButtonTextUnderIcon)
@@ -222,6 +298,8 @@ class MainWindow(QMainWindow):
         self.toolbar.addAction(self.light_org_action)
         self.statusBar().showMessage(f'{__appname__} started.')
         self.statusBar().show()
+        self.progress_label = QLabel('')
+        self.statusBar().addPermanentWidget(self.progress_label)
 
         window_x = settings.get(SETTINGS_KEY_WINDOW_X, 0)
         window_y = settings.get(SETTINGS_KEY_WINDOW_Y, 0)
@@ -232,8 +310,15 @@ class MainWindow(QMainWindow):
         self.resize(size)
         self.move(position)
 
-        self.__load_image_dir(image_dir)
-        self.__load_label_file(label_file)
+        self.__record_timings_changed()
+
+        if workspace_file is not None:
+            self.__load_workspace(workspace_file)
+        elif shard_file is not None:
+            self.__load_shard(shard_file)
+        else:
+            self.__load_image_dir(image_dir)
+            self.__load_label_file(label_file)
 
         self.status_label = QLabel('')
         self.statusBar().addPermanentWidget(self.status_label)
@@ -241,6 +326,7 @@ class MainWindow(QMainWindow):
     def closeEvent(self, event: QCloseEvent) -> None:
         if not self.__may_continue():
             event.ignore()
+            return
         settings.set(SETTINGS_KEY_IMAGE_DIR, self._image_dir if self._image_dir is not None else '.')
         settings.set(SETTINGS_KEY_LABEL_PATH, self._label_file if self._label_file is not None else '.')
         settings.set(SETTINGS_KEY_WINDOW_X, self.pos().x())
@@ -248,7 +334,19 @@ class MainWindow(QMainWindow):
         settings.set(SETTINGS_KEY_WINDOW_W, self.size().width())
         settings.set(SETTINGS_KEY_WINDOW_H, self.size().height())
         settings.set(SETTINGS_KEY_AUTO_SAVE, self.auto_saving_action.isChecked())
+        settings.set(SETTINGS_KEY_CHECK_FRAMES, self.check_on_open_action.isChecked())
+        settings.set(SETTINGS_KEY_MIRROR, self.mirror_action.isChecked())
+        settings.set(SETTINGS_KEY_LOUPE, self.loupe_action.isChecked())
         settings.save()
+        self.__stop_hashing()
+        self.__stop_checking()
+        self.__stop_mirroring()
+        self.__stop_preloading()
+        self.__stop_exporting()
+        self.__stop_events()
+        self.__update_sequence_status()
+        if self._image_index is not None:
+            self._image_index.save()
 
     def resizeEvent(self, event: QResizeEvent) -> None:
         super(MainWindow, self).resizeEvent(event)
@@ -256,14 +354,65 @@ class MainWindow(QMainWindow):
     def status(self, message, delay=5000):
         self.statusBar().showMessage(message, delay)
 
+    def image_dir(self) -> Optional[str]:
+        return self._image_dir
+
+    def label_file(self) -> Optional[str]:
+        return self._label_file
+
+    def open_sequence(self, image_dir: Optional[str], label_file: Optional[str]) -> None:
+        self.__load_image_dir(image_dir)
+        self.__load_label_file(label_file)
+
+    def discard_changes(self) -> None:
+        self.__set_dirty(False)
+
     def file_current_item_changed(self, item=None):
         self.__load_image()
 
+    def begin_canvas_edit(self) -> None:
+        self._history.begin_group()
+        if (self._client is not None) and \
+           (self._label_file is not None):
+            self._remote_edits = {}
+            self._remote_old = {}
+
+    def end_canvas_edit(self) -> None:
+        if self._remote_edits is not None:
+            self.__send_remote_edits()
+        self._history.end_group()
+
+    def __send_remote_edits(self) -> None:
+        edits = self._remote_edits
+        self._remote_edits = None
+        if len(edits) == 0:
+            return
+        try:
+            rejected = self._client.update(self._label_file, list(edits.items()))
+        except ServerError as e:
+            self.status(f'Server error: {e}')
+            rejected = list(edits)
+        else:
+            if len(rejected) > 0:
+                self.status(f'Frame {rejected[0] + 1} is being edited by another annotator.')
+        if len(rejected) == 0:
+            return
+        # the drag did not take effect, so it is reverted and not undoable.
+        self._history.drop_group()
+        idx = self.img_list.currentRow()
+        for i in rejected:
+            self.__apply_bbox(i, self._remote_old[i])
+            if i == idx:
+                self.canvas.bbox = copy.copy(self._bboxes[i])
+                self.canvas.update()
+
     def update_bboxes_from_canvas(self):
         idx = self.img_list.currentRow()
-        self._bboxes[idx] = copy.copy(self.canvas.bbox)
+        if not self.__set_bbox(idx, copy.copy(self.canvas.bbox)):
+            self.canvas.bbox = copy.copy(self._bboxes[idx])
+            self.canvas.update()
+            return
         self.__set_dirty(True)
-        self.__update_img_list()
 
     def zoom_request(self, delta: int) -> None:
         h_bar = self.scroll_bars[Qt.Orientation.Horizontal]
@@ -363,7 +512,321 @@ class MainWindow(QMainWindow):
             self.statusBar().showMessage(f'Label will be saved to {self._label_file}.')
             self.statusBar().show()
 
+    def __open_shard_dialog(self) -> None:
+        if not self.__may_continue():
+            return
+        shard_file, _ = QFileDialog.getOpenFileName(
+            self, f'{__appname__} - Open shard file', '.', 'Shard (*.json)')
+        if shard_file == '':
+            return
+        self.__load_shard(shard_file)
+
+    def __load_shard(self, shard_file: str) -> None:
+        try:
+            shard = Shard.load(shard_file)
+        except (OSError, ValueError, KeyError) as e:
+            QMB.critical(self, 'Error.', f'Could not read {shard_file}: {e}', QMB.StandardButton.Ok)
+            return
+        self.__load_image_dir(shard.image_dir, shard.files)
+        self.__load_label_file(shard.label_path)
+        self._shard = shard
+        self._shard_file = shard_file
+        self.status(f'Opened frames {shard.start} to {shard.end - 1} of {shard.image_dir}')
+
+    def __open_workspace_dialog(self) -> None:
+        if not self.__may_continue():
+            return
+        workspace_file, _ = QFileDialog.getOpenFileName(
+            self, f'{__appname__} - Open workspace file', '.', 'Workspace (*.json)')
+        if workspace_file == '':
+            return
+        self.__load_workspace(workspace_file)
+
+    def __load_workspace(self, workspace_file: str) -> None:
+        try:
+            workspace = Workspace.load(workspace_file)
+        except (OSError, ValueError, KeyError) as e:
+            QMB.critical(self, 'Error.', f'Could not read {workspace_file}: {e}', QMB.StandardButton.Ok)
+            return
+        self.__stop_preloading()
+        self._preloaded = {}
+        self._preload_failed = set()
+        self._workspace = workspace
+        self._workspace_file = workspace_file
+        self._workspace_idx = -1
+        self.seq_list.blockSignals(True)
+        self.seq_list.clear()
+        for idx in range(len(workspace)):
+            self.seq_list.addItem(QListWidgetItem())
+            self.__update_seq_list_item(idx)
+        self.seq_list.blockSignals(False)
+        self.seq_dock.show()
+        if len(workspace) == 0:
+            return
+        idx = workspace.next_pending(len(workspace) - 1)
+        self.__open_sequence(idx if idx is not None else 0)
+
+    def __open_sequence(self, idx: int) -> None:
+        if (self._workspace is None) or \
+           (idx < 0) or \
+           (idx == self._workspace_idx):
+            return
+        if not self.__may_continue():
+            self.__select_sequence(self._workspace_idx)
+            return
+        self.__update_sequence_status()
+        sequence = self._workspace[idx]
+        self._workspace_idx = idx
+        self.__select_sequence(idx)
+        # a preloaded sequence opens without listing its directory again.
+        image_index = self._preloaded.pop(sequence.image_dir, None)
+        self.__load_image_dir(sequence.image_dir, image_index=image_index)
+        if self._image_index is not None:
+            self.__load_label_file(sequence.label_path)
+            self.seq_list.item(idx).setIcon(QIcon(QPixmap.fromImage(
+                self._frame_cache.thumbnail(self._image_files[0]))))
+        self.__update_sequence_status()
+        self.__preload_next()
+
+    def __open_next_sequence(self) -> None:
+        if self._workspace is None:
+            return
+        idx = self._workspace.next_pending(self._workspace_idx)
+        if (idx is None) or (idx == self._workspace_idx):
+            QMB.information(self, 'Information', 'No other sequence left to label.')
+            return
+        if self.auto_saving_action.isChecked():
+            self.__save_label_file()
+        self.__open_sequence(idx)
+
+    def __mark_sequence_done(self) -> None:
+        if (self._workspace is None) or \
+           (self._workspace_idx < 0):
+            return
+        self.__save_label_file()
+        sequence = self._workspace[self._workspace_idx]
+        sequence.done = not sequence.done
+        self.__update_sequence_status()
+        if sequence.done:
+            self.__open_next_sequence()
+
+    def __select_sequence(self, idx: int) -> None:
+        self.seq_list.blockSignals(True)
+        self.seq_list.setCurrentRow(idx)
+        self.seq_list.blockSignals(False)
+
+    def __update_sequence_status(self) -> None:
+        if (self._workspace is None) or \
+           (self._workspace_idx < 0) or \
+           (self._image_dir is None):
+            return
+        sequence = self._workspace[self._workspace_idx]
+        if osp.abspath(self._image_dir) != sequence.image_dir:
+            return
+        sequence.labeled = self._frame_index.labeled_count()
+        sequence.frames = len(self._frame_index)
+        self.__update_seq_list_item(self._workspace_idx)
+        self._workspace.save(self._workspace_file)
+
+    def __update_seq_list_item(self, idx: int) -> None:
+        sequence = self._workspace[idx]
+        if sequence.done:
+            text = f'{sequence.name()} (done)'
+        elif sequence.frames > 0:
+            text = f'{sequence.name()} ({sequence.labeled} / {sequence.frames})'
+        else:
+            text = f'{sequence.name()}'
+        self.seq_list.item(idx).setText(text)
+
+    def __preload_next(self) -> None:
+        if (self._workspace is None) or \
+           (self._preload_thread is not None):
+            return
+        idx = self._workspace.next_pending(self._workspace_idx)
+        if (idx is None) or (idx == self._workspace_idx):
+            return
+        image_dir = self._workspace[idx].image_dir
+        # a missing or empty directory is not retried until the workspace
+        # is opened again.
+        if (image_dir in self._preloaded) or \
+           (image_dir in self._preload_failed):
+            return
+        self._preload_thread = PreloadThread(image_dir, self._frame_cache, parent=self)
+        self._preload_thread.loaded.connect(self.__sequence_preloaded)
+        self._preload_thread.finished.connect(self.__preloading_finished)
+        self._preload_thread.start()
+
+    def __sequence_preloaded(self, image_dir: str, image_index: Optional[ImageDir]) -> None:
+        if (image_index is None) or \
+           (len(image_index) == 0):
+            self._preload_failed.add(image_dir)
+            return
+        idx = self._workspace.index(image_dir)
+        if idx is None:
+            return
+        # only the next sequence is kept, an older preload is stale anyway.
+        self._preloaded = {image_dir: image_index}
+        self.seq_list.item(idx).setIcon(QIcon(QPixmap.fromImage(
+            self._frame_cache.thumbnail(image_index.files[0]))))
+
+    def __preloading_finished(self) -> None:
+        self._preload_thread.deleteLater()
+        self._preload_thread = None
+        self.__preload_next()
+
+    def __stop_preloading(self) -> None:
+        if self._preload_thread is None:
+            return
+        self._preload_thread.loaded.disconnect(self.__sequence_preloaded)
+        self._preload_thread.finished.disconnect(self.__preloading_finished)
+        self._preload_thread.requestInterruption()
+        self._preload_thread.wait()
+        self._preload_thread.deleteLater()
+        self._preload_thread = None
+
+    def __open_ref_label_file_dialog(self) -> None:
+        if self._label_file is None:
+            QMB.information(self, 'Information', 'You need to open label file beforehand.')
+            return
+        ref_label_file, _ = QFileDialog.getOpenFileName(
+            self, f'{__appname__} - Open reference label file',
+            osp.dirname(self._label_file), 'Text (*.txt)')
+        if ref_label_file == '':
+            return
+        self.__load_ref_label_file(ref_label_file)
+
+    def __load_ref_label_file(self, ref_label_file: Optional[str]) -> None:
+        self._ref_label_file = ref_label_file
+        self._ref_bboxes = [BBox() for _ in range(len(self._bboxes))]
+        self._agreement = None
+        self._worst_frames = []
+        self._worst_rank = -1
+        if ref_label_file is not None:
+            for idx, bbox in enumerate(iter_label_file(ref_label_file)):
+                if idx >= len(self._ref_bboxes):
+                    break
+                self._ref_bboxes[idx] = bbox
+            self._agreement = Agreement(self._bboxes, self._ref_bboxes)
+            self._worst_frames = self._agreement.worst_frames()
+        self.__load_image()
+        if self._agreement is not None:
+            summary = self._agreement.summary()
+            self.status(
+                f'Mean IoU {summary["mean_iou"]:.3f}, AUC {summary["auc"]:.3f}, '
+                f'{summary["mismatches"]} mismatches against {osp.basename(ref_label_file)}')
+
+    def __open_next_worst_image(self) -> None:
+        if self._agreement is None:
+            QMB.information(self, 'Information', 'You need to open reference label file beforehand.')
+            return
+        if self._worst_frames is None:
+            # edits changed the ranking, it is walked again from the worst.
+            self._worst_frames = self._agreement.worst_frames()
+            self._worst_rank = -1
+        if len(self._worst_frames) == 0:
+            return
+        self._worst_rank = (self._worst_rank + 1) % len(self._worst_frames)
+        if self.auto_saving_action.isChecked():
+            self.__save_label_file()
+        self.img_list.setCurrentRow(self._worst_frames[self._worst_rank])
+
+    def __export_dialog(self) -> None:
+        if self._label_file is None:
+            QMB.information(self, 'Information', 'You need to open label file beforehand.')
+            return
+        if not self.__may_continue():
+            return
+        selected = self.__select_export(osp.dirname(self._label_file))
+        if selected is None:
+            return
+        fmt, out_dir = selected
+        if self._shard is not None:
+            # only the frames of the shard, numbered as in the directory.
+            job = (
+                fmt, self._image_dir, self._label_file, out_dir,
+                osp.splitext(osp.basename(self._shard_file))[0],
+                self._shard.files, self._shard.start)
+        else:
+            job = (fmt, self._image_dir, self._label_file, out_dir)
+        self.__start_exporting([job])
+
+    def __export_workspace_dialog(self) -> None:
+        if self._workspace is None:
+            QMB.information(self, 'Information', 'You need to open workspace beforehand.')
+            return
+        if not self.__may_continue():
+            return
+        sequences = [s for s in self._workspace.sequences if osp.exists(s.label_path)]
+        if len(sequences) == 0:
+            QMB.information(self, 'Information', 'No sequence of the workspace has a label file.')
+            return
+        selected = self.__select_export(osp.dirname(self._workspace_file))
+        if selected is None:
+            return
+        fmt, out_dir = selected
+        names = sequence_names([s.image_dir for s in sequences])
+        self.__start_exporting([
+            (fmt, s.image_dir, s.label_path, out_dir, names[s.image_dir]) for s in sequences])
+
+    def __select_export(self, default_dir: str) -> Optional[tuple[str, str]]:
+        if self._export_thread is not None:
+            QMB.information(self, 'Information', 'An export is still running.')
+            return None
+        fmt, ok = QInputDialog.getItem(
+            self, f'{__appname__} - Export', 'Format', list(EXPORTERS), 0, False)
+        if not ok:
+            return None
+        out_dir = QFileDialog.getExistingDirectory(
+            self, f'{__appname__} - Export to the directory', default_dir)
+        if out_dir == '':
+            return None
+        return fmt, out_dir
+
+    def __start_exporting(self, jobs: list[tuple]) -> None:
+        # sequences are exported in parallel in the background, and the
+        # failures are reported together once all are done.
+        self._export_results = []
+        self._export_thread = ExportThread(jobs, parent=self)
+        self._export_thread.exported.connect(self.__sequence_exported)
+        self._export_thread.finished.connect(self.__exporting_finished)
+        self._export_thread.start()
+        self.status(f'Exporting {len(jobs)} sequences...', 0)
+
+    def __sequence_exported(self, image_dir: str, result: object) -> None:
+        self._export_results.append((image_dir, result))
+        if not isinstance(result, Exception):
+            self.status(f'Exported to {result}', 0)
+
+    def __exporting_finished(self) -> None:
+        if self._export_thread is not None:
+            self._export_thread.deleteLater()
+            self._export_thread = None
+        errors = [(d, e) for d, e in self._export_results if isinstance(e, Exception)]
+        done = len(self._export_results) - len(errors)
+        if len(errors) > 0:
+            QMB.critical(
+                self, 'Error exporting',
+                '\n'.join(f'{d}: {e}' for d, e in errors), QMB.StandardButton.Ok)
+            self.status(f'Exported {done} sequences, {len(errors)} failed.')
+        elif done == 1:
+            self.status(f'Exported to {self._export_results[0][1]}')
+        else:
+            self.status(f'Exported {done} sequences.')
+
+    def __stop_exporting(self) -> None:
+        if self._export_thread is None:
+            return
+        self._export_thread.exported.disconnect(self.__sequence_exported)
+        self._export_thread.finished.disconnect(self.__exporting_finished)
+        self._export_thread.requestInterruption()
+        self._export_thread.wait()
+        self._export_thread.deleteLater()
+        self._export_thread = None
+
     def __open_prev_image(self) -> None:
+        if self.unlabeled_only_action.isChecked():
+            self.__open_prev_unlabeled_image()
+            return
         cnt = self.img_list.count()
         idx = self.img_list.currentRow()
         if self.auto_saving_action.isChecked():
@@ -372,16 +835,24 @@ class MainWindow(QMainWindow):
             return
         if 0 <= idx - 1:
             idx -= 1
-            self.img_list.setCurrentRow(idx)
+            if self.skip_duplicates_action.isChecked() and self._duplicate_runs.ready():
+                idx = self._duplicate_runs.run(idx)[0]
+            idx = self.__skip_unreadable(idx, -1)
+            if idx >= 0:
+                self.img_list.setCurrentRow(idx)
         self.__load_image()
 
     def __open_next_image(self) -> bool:
+        if self.unlabeled_only_action.isChecked():
+            return self.__open_next_unlabeled_image()
         if self.auto_saving_action.isChecked():
             self.__save_label_file()
         cnt = self.img_list.count()
         idx = self.img_list.currentRow()
-        if idx + 1 < cnt:
-            idx += 1
+        if self.skip_duplicates_action.isChecked() and self._duplicate_runs.ready() and (idx >= 0):
+            idx = self._duplicate_runs.run(idx)[1] - 1
+        idx = self.__skip_unreadable(idx + 1, 1)
+        if idx < cnt:
             self.img_list.setCurrentRow(idx)
         else:
             QMB.information(self, 'Information', 'You have reached the end of the sequence.')
@@ -389,6 +860,41 @@ class MainWindow(QMainWindow):
         self.__load_image()
         return True
 
+    def __skip_unreadable(self, idx: int, step: int) -> int:
+        if not self.skip_unreadable_action.isChecked():
+            return idx
+        valid = self._image_index.valid()
+        while (0 <= idx < len(valid)) and (valid[idx] is False):
+            idx += step
+        return idx
+
+    def __open_next_unlabeled_image(self) -> bool:
+        idx = self._frame_index.next_unlabeled(self.img_list.currentRow())
+        if idx is None:
+            QMB.information(self, 'Information', 'No unlabeled image found after the current one.')
+            return False
+        if self.auto_saving_action.isChecked():
+            self.__save_label_file()
+        self.img_list.setCurrentRow(idx)
+        return True
+
+    def __open_prev_unlabeled_image(self) -> None:
+        idx = self._frame_index.prev_unlabeled(self.img_list.currentRow())
+        if idx is None:
+            return
+        if self.auto_saving_action.isChecked():
+            self.__save_label_file()
+        self.img_list.setCurrentRow(idx)
+
+    def __open_next_suspicious_image(self) -> None:
+        idx = self._outliers.next(self.img_list.currentRow())
+        if idx is None:
+            QMB.information(self, 'Information', 'No suspicious image found after the current one.')
+            return
+        if self.auto_saving_action.isChecked():
+            self.__save_label_file()
+        self.img_list.setCurrentRow(idx)
+
     def __next_image_and_copy(self) -> None:
         if self.__open_next_image():
             self.__copy_bbox()
@@ -413,32 +919,165 @@ class MainWindow(QMainWindow):
         idx = self.img_list.currentRow()
         if idx < 0:
             return
-        self._bboxes[idx] = BBox()
+        self.__set_bbox(idx, BBox())
         self.canvas.bbox = BBox()
         self.canvas.update()
-        self.__update_img_list()
 
     def __copy_bbox(self) -> None:
         idx = self.img_list.currentRow()
         if idx <= 0:
             return
-        self._bboxes[idx] = copy.copy(self._bboxes[idx - 1])
+        self.__set_bbox(idx, copy.copy(self._bboxes[idx - 1]))
         self.canvas.bbox = copy.copy(self._bboxes[idx])
         self.canvas.update()
-        self.__update_img_list()
 
+    def __clip_bboxes(self) -> None:
+        if self._label_file is None:
+            QMB.information(self, 'Information', 'You need to open label file beforehand.')
+            return
+        sizes = self._image_index.sizes()
+        indices = out_of_image(self._bboxes, sizes)
+        self.__set_bboxes(indices, [intersection(self._bboxes[idx], *sizes[idx]) for idx in indices])
+        if len(indices) > 0:
+            self.__set_dirty(True)
+            self.__load_image()
+        self.status(f'Clipped {len(indices)} bboxes.')
+
+    def __detect_duplicates(self) -> None:
+        if (self._image_index is None) or \
+           (self._hash_thread is not None):
+            return
+        hashes = self._image_index.hashes()
+        files = [(idx, f) for idx, (f, h) in enumerate(zip(self._image_files, hashes)) if h is None]
+        if len(files) == 0:
+            self.__hashing_finished()
+            return
+        self._hash_thread = HashThread(files, parent=self)
+        self._hash_thread.hashed.connect(self.__hashes_received)
+        self._hash_thread.progress.connect(self.__hashing_progress)
+        self._hash_thread.finished.connect(self.__hashing_finished)
+        self._hash_thread.start()
+
+    def __hashes_received(self, hashes: list[tuple[int, Optional[int]]]) -> None:
+        for idx, h in hashes:
+            self._image_index.set_hash(idx, h)
+
+    def __hashing_progress(self, done: int, num: int) -> None:
+        self.status(f'Hashing frames: {done} / {num}')
+
+    def __hashing_finished(self) -> None:
+        if self._hash_thread is not None:
+            self._hash_thread.deleteLater()
+            self._hash_thread = None
+        self._image_index.save()
+        self._duplicate_runs.reset(self._image_index.hashes())
+        runs = self._duplicate_runs.runs()
+        num = sum(end - start for start, end in runs)
+        self.status(f'{len(runs)} duplicate runs covering {num} frames.')
+
+    def __stop_hashing(self) -> None:
+        if self._hash_thread is None:
+            return
+        self._hash_thread.hashed.disconnect(self.__hashes_received)
+        self._hash_thread.progress.disconnect(self.__hashing_progress)
+        self._hash_thread.finished.disconnect(self.__hashing_finished)
+        self._hash_thread.requestInterruption()
+        self._hash_thread.wait()
+        self._hash_thread.deleteLater()
+        self._hash_thread = None
+
+    def __check_frames(self) -> None:
+        if (self._image_index is None) or \
+           (self._check_thread is not None):
+            return
+        if self._client is not None:
+            self.status('Frames are checked by the server side only.')
+            return
+        valid = self._image_index.valid()
+        files = [(idx, f) for idx, (f, ok) in enumerate(zip(self._image_files, valid)) if ok is None]
+        if len(files) == 0:
+            self.__checking_finished()
+            return
+        self._check_thread = CheckThread(files, parent=self)
+        self._check_thread.checked.connect(self.__frames_checked)
+        self._check_thread.progress.connect(self.__checking_progress)
+        self._check_thread.finished.connect(self.__checking_finished)
+        self._check_thread.start()
+
+    def __frames_checked(self, results: list[tuple[int, bool]]) -> None:
+        for idx, ok in results:
+            self._image_index.set_valid(idx, ok)
+            if not ok:
+                self.__update_img_list_item(idx)
+
+    def __checking_progress(self, done: int, num: int) -> None:
+        self.status(f'Checking frames: {done} / {num}')
+
+    def __checking_finished(self) -> None:
+        if self._check_thread is not None:
+            self._check_thread.deleteLater()
+            self._check_thread = None
+        self._image_index.save()
+        num = sum(1 for ok in self._image_index.valid() if ok is False)
+        self.status(f'{num} unreadable frames.')
+
+    def __stop_checking(self) -> None:
+        if self._check_thread is None:
+            return
+        self._check_thread.checked.disconnect(self.__frames_checked)
+        self._check_thread.progress.disconnect(self.__checking_progress)
+        self._check_thread.finished.disconnect(self.__checking_finished)
+        self._check_thread.requestInterruption()
+        self._check_thread.wait()
+        self._check_thread.deleteLater()
+        self._check_thread = None
+
+    def __apply_bbox_to_run(self) -> None:
+        if self._label_file is None:
+            QMB.information(self, 'Information', 'You need to open label file beforehand.')
+            return
+        if not self._duplicate_runs.ready():
+            QMB.information(self, 'Information', 'You need to detect duplicate frames beforehand.')
+            return
+        idx = self.img_list.currentRow()
+        if idx < 0:
+            return
+        start, end = self._duplicate_runs.run(idx)
+        self.__set_bboxes(range(start, end), copy.copy(self._bboxes[idx]))
+        self.__set_dirty(True)
+        self.status(f'Applied bbox to frames {start + 1} - {end}.')
+
+    @timed('MainWindow.load_image')
     def __load_image(self) -> None:
         idx = self.img_list.currentRow()
         if idx < 0:
             return
         self.canvas.setEnabled(False)
         file_path = self._image_files[idx]
-        reader = QImageReader(file_path)
-        reader.setAutoTransform(True)
-        img = reader.read()
-        if not isinstance(img, QImage):
-            img = QImage.fromData(img)
+        if self._image_index.valid()[idx] is False:
+            # known to be unreadable, the frame is shown blank instead of
+            # failing again.
+            self.canvas.pixmap = None
+            self.canvas.bbox = BBox()
+            self.canvas.update()
+            self.setWindowTitle(f'{__appname__} {file_path} [{idx + 1} / {self.img_list.count()}]')
+            self.status(f'{osp.basename(file_path)} is unreadable.', 0)
+            return
+        size = self._image_index.size(idx)
+        if size is not None:
+            self.canvas.image_size = QSize(*size)
+            self.__set_fit_window()
+        if self._client is not None:
+            img = self.__read_remote_image(file_path)
+        else:
+            img = self._frame_cache.image(self.__frame_path(idx))
         if img.isNull():
+            # the frame is not marked unreadable, as the failure may be
+            # transient; only the frame check marks frames. the previous
+            # frame must not stay on screen at this frame's size.
+            self.canvas.pixmap = None
+            self.canvas.bbox = BBox()
+            self.canvas.update()
             QMB.critical(
                 self, 'Error opening file',
                 f'Could not read {file_path}')
@@ -446,85 +1085,519 @@ class MainWindow(QMainWindow):
             return
         self.canvas.pixmap = QPixmap.fromImage(img)
         self.canvas.bbox = copy.copy(self._bboxes[idx])
-        self.status(f'Loaded {osp.basename(file_path)}')
+        self.canvas.ref_bbox = self._ref_bboxes[idx] if idx < len(self._ref_bboxes) else BBox()
+        if self._agreement is not None and self._agreement.ious[idx] is not None:
+            self.status(f'Loaded {osp.basename(file_path)} (IoU {self._agreement.ious[idx]:.3f})')
+        else:
+            self.status(f'Loaded {osp.basename(file_path)}')
         self.canvas.setEnabled(True)
-        self.__set_fit_window()
+        if self.canvas.image_size != self.canvas.pixmap.size():
+            self.canvas.image_size = self.canvas.pixmap.size()
+            self.__set_fit_window()
         idx = self.img_list.currentRow()
         cnt = self.img_list.count()
         self.setWindowTitle(f'{__appname__} {file_path} [{idx + 1} / {cnt}]')
         self.canvas.setFocus()
         self.canvas.update()
+        if self._client is not None:
+            self.__lock_frame(idx)
+
+    def __read_remote_image(self, file_path: str) -> QImage:
+        try:
+            return self._client.image(self._image_dir, file_path)
+        except ServerError as e:
+            self.status(f'Server error: {e}')
+            return QImage()
 
-    def __load_image_dir(self, image_dir: Optional[str]) -> None:
+    def __lock_frame(self, idx: int) -> None:
+        if self._label_file is None:
+            return
+        try:
+            holder = self._client.lock(self._label_file, idx)
+        except ServerError as e:
+            self.status(f'Server error: {e}')
+            return
+        if holder is not None:
+            self.status(f'Frame {idx + 1} is being edited by {holder}.', 0)
+
+    def __start_events(self, version: int) -> None:
+        self.__stop_events()
+        self._event_thread = EventThread(
+            self._client.url, self._client.client_id, self._label_file, version, parent=self)
+        self._event_thread.changed.connect(self.__remote_changed)
+        self._event_thread.reset.connect(self.__remote_reset)
+        self._event_thread.start()
+
+    def __stop_events(self) -> None:
+        if self._event_thread is None:
+            return
+        self._event_thread.changed.disconnect(self.__remote_changed)
+        self._event_thread.reset.disconnect(self.__remote_reset)
+        self._event_thread.requestInterruption()
+        self._event_thread.wait()
+        self._event_thread.deleteLater()
+        self._event_thread = None
+        if self._label_file is None:
+            return
+        try:
+            self._client.unlock(self._label_file)
+        except ServerError:
+            pass
+
+    def __remote_changed(self, changes: list[tuple[int, BBox]]) -> None:
+        current = self.img_list.currentRow()
+        for idx, bbox in changes:
+            if idx >= len(self._bboxes):
+                continue
+            self.__apply_bbox(idx, bbox)
+            if idx == current:
+                self.canvas.bbox = copy.copy(bbox)
+                self.canvas.update()
+
+    def __remote_reset(self) -> None:
+        # the change log moved past this client, take the whole store.
+        self.__load_label_file(self._label_file)
+
+    def __load_image_dir(
+            self,
+            image_dir: Optional[str],
+            files: Optional[list[str]] = None,
+            image_index: Optional[ImageDir] = None
+            ) -> None:
+        self.__stop_following()
+        self.__stop_hashing()
+        self.__stop_checking()
+        self.__stop_mirroring()
+        self.__stop_events()
+        self._shard_open = files is not None
+        self._shard = None
+        self._shard_file = None
+        self._duplicate_runs.clear()
         self._label_file = None
         self._bboxes.clear()
+        self._history.clear()
+        self._ref_label_file = None
+        self._ref_bboxes = []
+        self._agreement = None
+        self._outliers.reset(self._bboxes)
+        self._frame_index.reset([])
+        self.__update_progress()
+        self._stale_items.clear()
         self.img_list.clear()
         self.__set_dirty(False)
         self.canvas.pixmap = None
+        self.canvas.image_size = None
         self.canvas.bbox = BBox()
+        if self._image_index is not None:
+            self._image_index.save()
+            self._image_index = None
         if (image_dir is None) or \
            (image_dir == ''):
             self._image_dir = None
-            self._image_files.clear()
+            self._image_files = []
             self.canvas.update()
             return
-        self._image_files = scan_all_images(image_dir)
-        if len(self._image_files) == 0:
+        if (image_index is None) and (self._client is not None):
+            try:
+                image_index = RemoteImageDir(self._client, image_dir, files)
+            except ServerError as e:
+                QMB.critical(self, 'Error.', f'Could not list {image_dir}: {e}', QMB.StandardButton.Ok)
+                self._image_dir = None
+                self._image_files = []
+                self.canvas.update()
+                return
+        elif image_index is None:
+            image_index = ImageDir(image_dir, files)
+        if len(image_index) == 0:
             QMB.critical(
                 self, 'Error.', 'No image found.',
                 QMB.StandardButton.Ok)
             self._image_dir = None
+            self._image_files = []
             self.canvas.update()
             return
+        image_index.save()
+        self._image_index = image_index
+        self._image_files = image_index.files
         self._image_dir = image_dir
         self._bboxes = [BBox() for _ in range(len(self._image_files))]
+        # runs are available right away when every hash is cached.
+        if all(h is not None for h in image_index.hashes()):
+            self._duplicate_runs.reset(image_index.hashes())
         self.__update_img_list()
         self.img_list.setCurrentRow(0)
         self.__load_image()
+        self.__follow_changed()
+        self.__mirror_changed()
+        if self.check_on_open_action.isChecked() and (self._client is None):
+            self.__check_frames()
+
+    def __follow_changed(self) -> None:
+        self.__stop_following()
+        # a shard holds a fixed range of frames, the rest of the directory
+        # must not be appended to it.
+        if (not self.follow_action.isChecked()) or \
+           (self._image_index is None) or \
+           (self._shard_open) or \
+           (self._client is not None):
+            return
+        self._follower = DirectoryFollower(self._image_dir, self._image_files, parent=self)
+        self._follower.files_added.connect(self.__append_images)
+        self._follower.check()
+
+    def __mirror_changed(self) -> None:
+        self.__stop_mirroring()
+        if (not self.mirror_action.isChecked()) or \
+           (self._image_index is None) or \
+           (self._client is not None):
+            return
+        if self._mirror is None:
+            self._mirror = Mirror(
+                settings.get(SETTINGS_KEY_MIRROR_DIR, osp.join(CACHE_DIR, 'mirror')),
+                max_bytes=settings.get(SETTINGS_KEY_MIRROR_MB, 4096) * 1024 * 1024)
+        self.__start_mirroring(0)
+
+    def __start_mirroring(self, start: int) -> None:
+        self._mirror_thread = MirrorThread(
+            self._mirror, self._image_dir, list(self._image_files),
+            pos=self.img_list.currentRow(), start=start, parent=self)
+        self._mirror_thread.finished.connect(self.__mirroring_finished)
+        self._mirror_thread.start()
+
+    def __mirror_appended(self, start: int) -> None:
+        # frames appended by the follower join the running copy, or start
+        # a new one over the new frames.
+        if (self._mirror is None) or \
+           (not self.mirror_action.isChecked()) or \
+           (self._client is not None):
+            return
+        if self._mirror_thread is not None:
+            if self._mirror_thread.append(self._image_files[start:]):
+                return
+            self.__stop_mirroring()
+        self.__start_mirroring(start)
+
+    def __mirroring_finished(self) -> None:
+        if self._mirror_thread is None:
+            return
+        thread = self._mirror_thread
+        if thread.error is not None:
+            self.status(f'Could not mirror frames: {thread.error}')
+        elif thread.full:
+            self.status('The mirror is too small for this sequence, the rest is read from the source.')
+        elif thread.failed > 0:
+            self.status(f'Mirrored {thread.copied} frames locally, {thread.failed} could not be copied.')
+        else:
+            self.status(f'Mirrored {thread.copied} frames locally.')
+        self._mirror_thread.deleteLater()
+        self._mirror_thread = None
+
+    def __stop_mirroring(self) -> None:
+        if self._mirror_thread is None:
+            return
+        self._mirror_thread.finished.disconnect(self.__mirroring_finished)
+        self._mirror_thread.requestInterruption()
+        self._mirror_thread.wait()
+        self._mirror_thread.deleteLater()
+        self._mirror_thread = None
+
+    def __frame_path(self, idx: int) -> str:
+        # the local copy of the frame when mirroring, which is also where
+        # the mirror continues copying.
+        file_path = self._image_files[idx]
+        if (self._mirror is None) or not self.mirror_action.isChecked():
+            return file_path
+        if self._mirror_thread is not None:
+            self._mirror_thread.seek(idx)
+        return self._mirror.path(file_path)
+
+    def __stop_following(self) -> None:
+        if self._follower is None:
+            return
+        self._follower.stop()
+        self._follower.deleteLater()
+        self._follower = None
+
+    def __append_images(self, files: list[str]) -> None:
+        start = len(self._bboxes)
+        num = len(files)
+        self._image_index.append(files)
+        self._bboxes.extend(BBox() for _ in range(num))
+        self._frame_index.append([False] * num)
+        self._outliers.append(num)
+        if self._duplicate_runs.ready():
+            self._duplicate_runs.reset(self._image_index.hashes())
+        if self._agreement is not None:
+            self._ref_bboxes.extend(BBox() for _ in range(num))
+            self._agreement.append(num)
+        for idx in range(start, start + num):
+            self.img_list.addItem(QListWidgetItem())
+            self.__update_img_list_item(idx)
+        self.__update_progress()
+        self.__mirror_appended(start)
+        idx = self.img_list.currentRow()
+        if idx >= 0:
+            self.setWindowTitle(f'{__appname__} {self._image_files[idx]} [{idx + 1} / {self.img_list.count()}]')
+        self.status(f'{num} new images.')
+
+    def __set_bbox(self, idx: int, bbox: BBox) -> bool:
+        if self._remote_edits is not None:
+            self._remote_old.setdefault(idx, self._bboxes[idx])
+            self._remote_edits[idx] = bbox
+        elif (self._client is not None) and \
+             (self._label_file is not None):
+            try:
+                rejected = self._client.update(self._label_file, [(idx, bbox)])
+            except ServerError as e:
+                self.status(f'Server error: {e}')
+                return False
+            if len(rejected) > 0:
+                self.status(f'Frame {idx + 1} is being edited by another annotator.')
+                return False
+        self._history.record([idx], [self._bboxes[idx]], [bbox])
+        self.__apply_bbox(idx, bbox)
+        return True
+
+    def __set_bboxes(
+            self,
+            indices: range | list[int],
+            bboxes: list[BBox] | BBox,
+            record: bool = True
+            ) -> None:
+        # a single bbox is set to every frame and recorded once.
+        uniform = bboxes if isinstance(bboxes, BBox) else None
+        if uniform is not None:
+            bboxes = [BBox(uniform.x, uniform.y, uniform.w, uniform.h) for _ in indices]
+        if (self._client is not None) and \
+           (self._label_file is not None):
+            try:
+                rejected = set(self._client.update(self._label_file, list(zip(indices, bboxes))))
+            except ServerError as e:
+                self.status(f'Server error: {e}')
+                return
+            if len(rejected) > 0:
+                self.status(f'{len(rejected)} frames are being edited by other annotators.')
+                kept = [k for k, idx in enumerate(indices) if idx not in rejected]
+                indices = [indices[k] for k in kept]
+                bboxes = [bboxes[k] for k in kept]
+                uniform = None
+        if len(indices) == 0:
+            return
+        if record:
+            self._history.record(
+                indices, [self._bboxes[idx] for idx in indices],
+                uniform if uniform is not None else bboxes)
+        if len(indices) < BULK_REFRESH_SIZE:
+            for idx, bbox in zip(indices, bboxes):
+                self.__apply_bbox(idx, bbox)
+            return
+        # large edits update the indexes over the edited frames and relabel
+        # only the rows in view.
+        for idx, bbox in zip(indices, bboxes):
+            self._bboxes[idx] = bbox
+        if uniform is not None:
+            labeled = [not uniform.empty()] * len(indices)
+        else:
+            labeled = [not bbox.empty() for bbox in bboxes]
+        self._frame_index.update(indices, labeled)
+        self._outliers.invalidate(indices)
+        if self._agreement is not None:
+            for idx in indices:
+                self._agreement.update(idx, self._bboxes[idx], self._ref_bboxes[idx])
+            self._worst_frames = None
+        self._stale_items.update(indices)
+        # an edit also changes the transition into the following frame.
+        if isinstance(indices, range):
+            self._stale_items.add(indices[-1] + 1)
+        else:
+            self._stale_items.update(idx + 1 for idx in indices)
+        self._stale_items.discard(len(self._bboxes))
+        if self.unlabeled_only_action.isChecked():
+            for idx, v in zip(indices, labeled):
+                self.img_list.setRowHidden(idx, v)
+        self.__refresh_visible_items()
+        self.__update_progress()
+
+    def __undo(self) -> None:
+        # an edit still being dragged is finished before it is undone.
+        self.end_canvas_edit()
+        edit = self._history.undo()
+        if edit is None:
+            return
+        self.__set_bboxes(edit.indices, edit.old_bboxes(), record=False)
+        self.__show_edit(edit)
+        self.status(f'Undid the edit of {len(edit)} frames.')
+
+    def __redo(self) -> None:
+        self.end_canvas_edit()
+        edit = self._history.redo()
+        if edit is None:
+            return
+        self.__set_bboxes(edit.indices, edit.new_bboxes(), record=False)
+        self.__show_edit(edit)
+        self.status(f'Redid the edit of {len(edit)} frames.')
+
+    def __show_edit(self, edit: Edit) -> None:
+        self.__set_dirty(True)
+        idx = self.img_list.currentRow()
+        if (len(edit) == 1) and (edit.indices[0] != idx):
+            self.img_list.setCurrentRow(edit.indices[0])
+        elif idx >= 0:
+            self.canvas.bbox = copy.copy(self._bboxes[idx])
+            self.canvas.update()
 
+    def __apply_bbox(self, idx: int, bbox: BBox) -> None:
+        self._bboxes[idx] = bbox
+        self._frame_index.set(idx, not bbox.empty())
+        changed = self._outliers.update(idx)
+        if self._agreement is not None:
+            self._agreement.update(idx, bbox, self._ref_bboxes[idx])
+            self._worst_frames = None
+        self.__update_img_list_item(idx)
+        for i in changed:
+            if i != idx:
+                self.__update_img_list_item(i)
+        self.__update_progress()
+
+    @timed('MainWindow.update_img_list')
     def __update_img_list(self) -> None:
         num = len(self._image_files)
         assert len(self._bboxes) == num
+        self._outliers.reset(self._bboxes)
+        self._frame_index.reset([not bbox.empty() for bbox in self._bboxes])
+        self._stale_items.clear()
         if self.img_list.count() != num:
             self.img_list.clear()
             for _ in range(num):
                 self.img_list.addItem(QListWidgetItem())
-        for i, (image_file, bbox) in enumerate(zip(self._image_files, self._bboxes)):
-            file = osp.basename(image_file)
-            if bbox.empty():
-                text = f'{file} (no bbox)'
-            else:
-                text = f'{file}'
-            self.img_list.item(i).setText(text)
+        for i in range(num):
+            self.__update_img_list_item(i)
+        self.__update_progress()
+
+    def __update_img_list_item(self, idx: int) -> None:
+        file = osp.basename(self._image_files[idx])
+        if self._image_index.valid()[idx] is False:
+            text = f'{file} (unreadable)'
+        elif self._bboxes[idx].empty():
+            text = f'{file} (no bbox)'
+        elif self._outliers.flagged(idx):
+            text = f'{file} (suspicious)'
+        else:
+            text = f'{file}'
+        self.img_list.item(idx).setText(text)
+        self.img_list.setRowHidden(
+            idx,
+            self.unlabeled_only_action.isChecked() and self._frame_index.labeled(idx))
+
+    def __refresh_visible_items(self) -> None:
+        if len(self._stale_items) == 0:
+            return
+        first = self.img_list.indexAt(QPoint(0, 0)).row()
+        if first < 0:
+            return
+        last = self.img_list.indexAt(QPoint(0, self.img_list.viewport().height() - 1)).row()
+        if last < 0:
+            last = self.img_list.count() - 1
+        for idx in range(first, last + 1):
+            if idx in self._stale_items:
+                self._stale_items.discard(idx)
+                self.__update_img_list_item(idx)
+
+    def __filter_img_list(self) -> None:
+        unlabeled_only = self.unlabeled_only_action.isChecked()
+        for idx in range(self.img_list.count()):
+            self.img_list.setRowHidden(idx, unlabeled_only and self._frame_index.labeled(idx))
+        item = self.img_list.currentItem()
+        if item is not None:
+            self.img_list.scrollToItem(item)
+
+    def __update_progress(self) -> None:
+        num = len(self._frame_index)
+        if num == 0:
+            self.progress_label.setText('')
+            return
+        cnt = self._frame_index.labeled_count()
+        self.progress_label.setText(f'Labeled: {cnt} / {num}')
 
     def __load_label_file(self, label_file: Optional[str]) -> None:
+        self.__stop_events()
+        self._history.clear()
         self._label_file = label_file
         self._bboxes = [BBox() for _ in range(len(self._bboxes))]
         if label_file is None:
+            # the outliers and the followed frames refer to the new list.
+            self.__update_img_list()
             return
-        if not osp.exists(label_file):
-            with open(label_file, 'w') as f:
-                pass
-        with open(label_file, 'r') as f:
-            for idx, line in enumerate(f.readlines()):
-                s = line.split(',')
-                self._bboxes[idx] = BBox(
-                    x=float(s[0]), y=float(s[1]), w=float(s[2]), h=float(s[3]))
+        if self._client is not None:
+            try:
+                version, bboxes, _ = self._client.labels(label_file)
+            except ServerError as e:
+                QMB.critical(self, 'Error.', f'Could not read {label_file}: {e}', QMB.StandardButton.Ok)
+                self._label_file = None
+                return
+            self._bboxes[:len(bboxes)] = bboxes[:len(self._bboxes)]
+            self.__start_events(version)
+        else:
+            if not osp.exists(label_file):
+                with open(label_file, 'w') as f:
+                    pass
+            for idx, bbox in enumerate(iter_label_file(label_file)):
+                self._bboxes[idx] = bbox
         self.__update_img_list()
+        if self._ref_label_file is not None:
+            self.__load_ref_label_file(self._ref_label_file)
+            return
         self.__load_image()
 
+    @timed('MainWindow.save_label_file')
     def __save_label_file(self) -> None:
         if self._label_file is None:
             return
         if self._dirty is False:
             return
-        with open(self._label_file, 'w') as f:
-            for bbox in self._bboxes:
-                f.write(str(bbox) + '\n')
+        if self._client is not None:
+            try:
+                self._client.save(self._label_file)
+            except ServerError as e:
+                self.status(f'Server error: {e}')
+                return
+        else:
+            write_label_file(self._label_file, self._bboxes)
         self.__set_dirty(False)
+        self.__update_sequence_status()
         self.statusBar().showMessage(f'Saved to {self._label_file}')
         self.statusBar().show()
 
+    def __record_timings_changed(self) -> None:
+        enabled = self.record_timings_action.isChecked()
+        profiling.enable(enabled)
+        self.timing_dock.setVisible(enabled)
+        if enabled:
+            self.timing_timer.start()
+        else:
+            self.timing_timer.stop()
+
+    def __reset_timings(self) -> None:
+        profiling.reset()
+        self.__update_timings()
+
+    def __update_timings(self) -> None:
+        rows = profiling.summary()
+        self.timing_table.setRowCount(len(rows))
+        for i, (name, num, p50, p95, max_) in enumerate(rows):
+            values = [name, str(num), f'{p50:.2f}', f'{p95:.2f}', f'{max_:.2f}']
+            for j, value in enumerate(values):
+                self.timing_table.setItem(i, j, QTableWidgetItem(value))
+        self.timing_table.resizeColumnsToContents()
+
+    def __export_trace_dialog(self) -> None:
+        trace_file, _ = QFileDialog.getSaveFileName(
+            self, f'{__appname__} - Export timing trace', 'trace.json', 'Trace (*.json)')
+        if trace_file == '':
+            return
+        num = profiling.export_chrome_trace(trace_file)
+        self.status(f'Exported {num} spans to {trace_file}')
+
     def __reset_zoom(self) -> None:
         self.zoom_spinbox.setValue(100)
 
@@ -539,8 +1612,8 @@ class MainWindow(QMainWindow):
         w1 = self.centralWidget().width() - e
         h1 = self.centralWidget().height() - e
         a1 = w1 / h1
-        w2 = self.canvas.pixmap.width() - 0.0
-        h2 = self.canvas.pixmap.height() - 0.0
+        w2 = self.canvas.image_size.width() - 0.0
+        h2 = self.canvas.image_size.height() - 0.0
         a2 = w2 / h2
         return w1 / w2 if a1 <= a2 else h1 / h2
 
@@ -562,7 +1635,7 @@ class MainWindow(QMainWindow):
         self.canvas.update()
 
     def __zoom_value_changed(self):
-        if self.canvas.pixmap is None:
+        if self.canvas.image_size is None:
             return
         self.canvas.adjustSize()
         self.canvas.update()
@@ -627,6 +1700,8 @@ class Canvas(QWidget):
         self.p = parent
         self.mode = CANVAS_EDIT_MODE
         self.pixmap: Optional[QPixmap] = None
+        self.ref_bbox: BBox = BBox()
+        self.image_size: Optional[QSize] = None
         self.bbox: BBox = BBox()
 
         self._painter = QPainter()
@@ -637,6 +1712,9 @@ class Canvas(QWidget):
         self._bbox_sy: Optional[float] = None
         self._highlighted_bbox: bool = False
         self._highlighted_pidx: Optional[int] = None
+        self._loupe_pidx: Optional[int] = None
+        self._loupe_zoom: float = settings.get(SETTINGS_KEY_LOUPE_ZOOM, 8.0)
+        self._loupe_size: int = settings.get(SETTINGS_KEY_LOUPE_SIZE, 192)
         self._overlay_color: Optional[QColor] = None
 
         self.setMouseTracking(True)
@@ -674,6 +1752,10 @@ class Canvas(QWidget):
             self.__set_point(2, self.bbox.xmax() + 1.0, self.bbox.ymax())
         elif key == Qt.Key.Key_8:
             self.__set_point(2, self.bbox.xmax() - 1.0, self.bbox.ymax())
+        if Qt.Key.Key_1 <= key <= Qt.Key.Key_4:
+            self._loupe_pidx = 0
+        elif Qt.Key.Key_5 <= key <= Qt.Key.Key_8:
+            self._loupe_pidx = 2
         self.update()
 
     def leaveEvent(self, event: QEvent) -> None:
@@ -711,6 +1793,7 @@ class Canvas(QWidget):
                     self.p.scroll_request(dmx * scale, Qt.Orientation.Horizontal)
                     self.p.scroll_request(dmy * scale, Qt.Orientation.Vertical)
         else:
+            self._loupe_pidx = None
             if self.mode == CANVAS_EDIT_MODE:
                 if not self.bbox.empty():
                     pidx = self.__nearest_point_idx(pos, 20.0 / scale)
@@ -741,6 +1824,7 @@ class Canvas(QWidget):
         pos = self.__transform_pos(event.pos())
 
         if event.button() == Qt.MouseButton.LeftButton:
+            self.p.begin_canvas_edit()
             if self.mode == CANVAS_CREATE_MODE:
                 self._bbox_sx = pos.x()
                 self._bbox_sy = pos.y()
@@ -758,6 +1842,7 @@ class Canvas(QWidget):
         pos = self.__transform_pos(event.pos())
 
         if event.button() == Qt.MouseButton.LeftButton:
+            self.p.end_canvas_edit()
             if (self.mode == CANVAS_CREATE_MODE) and \
                (self._bbox_sx is not None) and \
                (self._bbox_sy is not None):
@@ -779,13 +1864,13 @@ class Canvas(QWidget):
 
         self.update()
 
+    @timed('Canvas.paintEvent')
     def paintEvent(self, event: QPaintEvent) -> None:
         if self.pixmap is None:
             super(Canvas, self).paintEvent(event)
             return
 
         scale = self.__scale()
-        point_size_base: float = 8.0
 
         p = self._painter
         p.begin(self)
@@ -804,35 +1889,8 @@ class Canvas(QWidget):
 
         p.drawPixmap(0, 0, pixmap_out)
 
-        if not self.bbox.empty():
-            line_path = QPainterPath()
-            line_path.moveTo(self.bbox.get_point(0))
-            for pidx in range(4):
-                line_path.lineTo(self.bbox.get_point(pidx))
-            line_path.lineTo(self.bbox.get_point(0))
-            if self._highlighted_bbox:
-                pen = QPen(BBOX_HIGHLIGHTED_COLOR)
-            else:
-                pen = QPen(BBOX_COLOR)
-            pen.setWidth(max(1, int(round(2.0 / scale))))
-            p.setPen(pen)
-            p.drawPath(line_path)
-
-            for pidx in range(4):
-                point = self.bbox.get_point(pidx)
-                d = point_size_base / scale
-                if pidx == self._highlighted_pidx:
-                    d *= 1.0
-                    path = QPainterPath()
-                    path.addRect(point.x() - d / 2, point.y() - d / 2, d, d)
-                    p.drawPath(path)
-                    p.fillPath(path, POINT_HIGHLIGHTED_COLOR)
-                else:
-                    d *= 1.0
-                    path = QPainterPath()
-                    path.addEllipse(point, d / 2.0, d / 2.0)
-                    p.drawPath(path)
-                    p.fillPath(path, POINT_COLOR)
+        draw_reference_bbox(p, self.ref_bbox, scale)
+        draw_bbox(p, self.bbox, scale, self._highlighted_bbox, self._highlighted_pidx)
 
         if self.mode == CANVAS_CREATE_MODE:
             if (self._bbox_sx is None) and \
@@ -850,6 +1908,8 @@ class Canvas(QWidget):
                            int(abs(self._mx - self._bbox_sx)),
                            int(abs(self._my - self._bbox_sy)))
 
+        self.__draw_loupe(p, pixmap_out)
+
         self.setAutoFillBackground(True)
         pal = self.palette()
         pal.setColor(self.backgroundRole(), QColor(232, 232, 232, 255))
@@ -872,8 +1932,8 @@ class Canvas(QWidget):
         return self.minimumSizeHint()
 
     def minimumSizeHint(self):
-        if self.pixmap:
-            return self.__scale() * self.pixmap.size()
+        if self.image_size is not None:
+            return self.__scale() * self.image_size
         return super(Canvas, self).minimumSizeHint()
 
     def set_mode(self, mode: int) -> None:
@@ -908,8 +1968,8 @@ class Canvas(QWidget):
     def __offset_to_center(self) -> QPointF:
         scale = self.__scale()
         area = super(Canvas, self).size()
-        w = self.pixmap.width() * scale
-        h = self.pixmap.height() * scale
+        w = self.image_size.width() * scale
+        h = self.image_size.height() * scale
         aw = area.width()
         ah = area.height()
         x = (aw - w) / (2 * scale) if (w < aw) else 0
@@ -919,26 +1979,56 @@ class Canvas(QWidget):
     def __scale(self) -> float:
         return 0.01 * self.p.zoom_spinbox.value()
 
+    def __draw_loupe(self, p: QPainter, pixmap: QPixmap) -> None:
+        # the neighbourhood of the active corner magnified from the full
+        # resolution frame into an inset away from it. only the source
+        # rectangle is scaled, so the cost follows the loupe size.
+        pidx = self._highlighted_pidx if self._highlighted_pidx is not None else self._loupe_pidx
+        if (pidx is None) or \
+           (self.bbox.empty()) or \
+           (not self.p.loupe_action.isChecked()):
+            return
+        point = self.bbox.get_point(pidx)
+        size = self._loupe_size
+        half = size / (2.0 * self._loupe_zoom)
+        source = QRectF(point.x() - half, point.y() - half, 2.0 * half, 2.0 * half)
+        visible = QRectF(self.visibleRegion().boundingRect())
+        pos = (point + self.__offset_to_center()) * self.__scale()
+        margin = 8.0
+        x = visible.left() + margin if pos.x() > visible.center().x() else visible.right() - margin - size
+        y = visible.top() + margin if pos.y() > visible.center().y() else visible.bottom() - margin - size
+        target = QRectF(x, y, size, size)
+
+        p.save()
+        p.resetTransform()
+        p.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, False)
+        p.fillRect(target, QColor(232, 232, 232))
+        p.setClipRect(target)
+        p.translate(target.topLeft())
+        p.scale(self._loupe_zoom, self._loupe_zoom)
+        p.translate(-source.topLeft())
+        p.drawPixmap(source, pixmap, source)
+        pen = QPen(BBOX_HIGHLIGHTED_COLOR)
+        pen.setCosmetic(True)
+        p.setPen(pen)
+        p.setBrush(Qt.BrushStyle.NoBrush)
+        p.drawRect(QRectF(self.bbox.x, self.bbox.y, self.bbox.w, self.bbox.h))
+        p.setClipping(False)
+        p.resetTransform()
+        p.setPen(QColor(0, 0, 0))
+        p.drawRect(target)
+        p.restore()
+
     def __in_pixmap_xy(self, x: int | float, y: int | float) -> bool:
-        w, h = self.pixmap.width(), self.pixmap.height()
+        w, h = self.image_size.width(), self.image_size.height()
         return (0 <= x <= w) and (0 <= y <= h)
     
     def __in_pixmap_bbox(self, bbox: BBox) -> bool:
-        return (self.pixmap is not None) and \
-               (0 <= bbox.xmin()) and \
-               (bbox.xmax() <= self.pixmap.width()) and \
-               (0 <= bbox.ymin()) and \
-               (bbox.ymax() <= self.pixmap.height())
+        return (self.image_size is not None) and \
+               in_image(bbox, self.image_size.width(), self.image_size.height())
 
     def __intersection_pixmap(self, bbox: BBox) -> BBox:
-        xmin = max(bbox.xmin(), 0.0)
-        ymin = max(bbox.ymin(), 0.0)
-        xmax = min(bbox.xmax(), self.pixmap.width())
-        ymax = min(bbox.ymax(), self.pixmap.height())
-        if (xmax <= xmin) or (ymax <= ymin):
-            return BBox()
-        return BBox.from_xmin_ymin_xmax_ymax(
-            xmin, ymin, xmax, ymax)
+        return intersection(bbox, self.image_size.width(), self.image_size.height())
 
     def __move_bbox(self, dx: float, dy: float) -> None:
         if self.bbox.empty():
@@ -951,8 +2041,8 @@ class Canvas(QWidget):
     def __set_point(self, pidx: int, x: float, y: float) -> int:
         if self.bbox.empty():
             return
-        x = clip(x, 0.0, self.pixmap.width())
-        y = clip(y, 0.0, self.pixmap.height())
+        x = clip(x, 0.0, self.image_size.width())
+        y = clip(y, 0.0, self.image_size.height())
         self.bbox.set_xy(pidx, x, y)
         cx = self.bbox.cx()
         cy = self.bbox.cy()
@@ -974,35 +2064,6 @@ class Canvas(QWidget):
         return None
 
 
-def clip(
-        value: int | float,
-        lower: int | float,
-        upper: int | float):
-    return max(lower, min(value, upper))
-
-
-def natural_sort(list: list[str], key = lambda s:s):
-    def get_alphanum_key_func(key):
-        convert = lambda text: int(text) if text.isdigit() else text
-        return lambda s: [convert(c) for c in re.split('([0-9]+)', key(s))]
-    sort_key = get_alphanum_key_func(key)
-    list.sort(key=sort_key)
-
-
-def scan_all_images(folder_path):
-    extensions = [
-        '.{}'.format(fmt.data().decode('ascii').lower())
-        for fmt in QImageReader.supportedImageFormats()]
-    images = []
-    for root, dirs, files in os.walk(folder_path):
-        for file in files:
-            if file.lower().endswith(tuple(extensions)):
-                images.append(osp.abspath(osp.join(root, file)))
-        break
-    natural_sort(images, key=lambda x: x.lower())
-    return images
-
-
 def read_icon(name):
     path = osp.join('icon', name)
     if hasattr(sys, '_MEIPASS'):
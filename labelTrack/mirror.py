@@ -0,0 +1,218 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import os.path as osp
+import shutil
+import threading
+import time
+from typing import Optional
+from PyQt6.QtCore import QThread
+
+
+MIRROR_BATCH_FILES: int = 32
+MIRROR_WORKERS: int = 4
+STALE_TMP_SECONDS: float = 600.0
+
+
+class Mirror(object):
+
+    # local copies of the frames of sequences on network mounted
+    # directories, one directory per sequence under root. a copy keeps the
+    # size and mtime of its source and is read only while both still match.
+    # whole sequences are evicted in lru order, by the mtime of their
+    # directory, once the copies exceed max_bytes.
+
+    def __init__(self, root: str, max_bytes: int = 4 * 1024 * 1024 * 1024) -> None:
+        self.root: str = osp.abspath(root)
+        self.max_bytes: int = max_bytes
+        self._usage: Optional[dict[str, int]] = None
+        self._lock: threading.Lock = threading.Lock()
+
+    def local_dir(self, image_dir: str) -> str:
+        key = hashlib.sha1(osp.abspath(image_dir).encode('utf-8')).hexdigest()
+        return osp.join(self.root, key)
+
+    def local_path(self, file_path: str) -> str:
+        return osp.join(self.local_dir(osp.dirname(file_path)), osp.basename(file_path))
+
+    def path(self, file_path: str) -> str:
+        # the file to read a frame from, its copy when that is up to date.
+        local_path = self.local_path(file_path)
+        local_stat = _file_stat(local_path)
+        if (local_stat is None) or (local_stat != _file_stat(file_path)):
+            return file_path
+        return local_path
+
+    def touch(self, image_dir: str) -> None:
+        local_dir = self.local_dir(image_dir)
+        os.makedirs(local_dir, exist_ok=True)
+        os.utime(local_dir)
+        with self._lock:
+            self.__usage().setdefault(local_dir, 0)
+
+    def copy(self, file_path: str) -> bool:
+        # returns whether the copy is up to date afterwards.
+        source_stat = _file_stat(file_path)
+        local_path = self.local_path(file_path)
+        local_stat = _file_stat(local_path)
+        if source_stat is None:
+            return False
+        if local_stat == source_stat:
+            return True
+        tmp_path = local_path + '.tmp'
+        try:
+            shutil.copy2(file_path, tmp_path)
+            os.replace(tmp_path, local_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+        with self._lock:
+            usage = self.__usage()
+            key = osp.dirname(local_path)
+            usage[key] = usage.get(key, 0) + source_stat[0] - (local_stat[0] if local_stat is not None else 0)
+        return True
+
+    def evict(self, keep: str) -> bool:
+        # returns false when the sequence to keep alone exceeds the cap.
+        keep = self.local_dir(keep)
+        with self._lock:
+            usage = self.__usage()
+            while sum(usage.values()) > self.max_bytes:
+                victims = [key for key in usage if key != keep]
+                if len(victims) == 0:
+                    return False
+                victim = min(victims, key=lambda key: _dir_mtime(key))
+                shutil.rmtree(victim, ignore_errors=True)
+                del usage[victim]
+        return True
+
+    def __usage(self) -> dict[str, int]:
+        if self._usage is None:
+            self._usage = {}
+            if osp.isdir(self.root):
+                for entry in os.scandir(self.root):
+                    if entry.is_dir():
+                        self._usage[entry.path] = _dir_usage(entry.path)
+        return self._usage
+
+
+class MirrorThread(QThread):
+
+    # copies the frames of a sequence from start on into the mirror in
+    # batches of consecutive frames, starting from the current frame and
+    # following it when the user jumps. a few copies are in flight at once
+    # to hide the latency of the network mount. frames appended while it
+    # runs are copied as well.
+
+    def __init__(
+            self,
+            mirror: Mirror,
+            image_dir: str,
+            files: list[str],
+            pos: int = 0,
+            start: int = 0,
+            parent=None
+            ) -> None:
+        super(MirrorThread, self).__init__(parent)
+        self._mirror: Mirror = mirror
+        self._image_dir: str = image_dir
+        self._files: list[str] = files
+        self._pending: bytearray = bytearray(start) + b'\x01' * (len(files) - start)
+        self._pos: int = max(pos, start)
+        self._lock: threading.Lock = threading.Lock()
+        self._done: bool = False
+        self.full: bool = False
+        self.error: Optional[OSError] = None
+        self.copied: int = 0
+        self.failed: int = 0
+
+    def seek(self, idx: int) -> None:
+        with self._lock:
+            self._pos = idx
+
+    def append(self, files: list[str]) -> bool:
+        # returns false once the thread stopped taking frames.
+        with self._lock:
+            if self._done:
+                return False
+            self._files.extend(files)
+            self._pending.extend(b'\x01' * len(files))
+            return True
+
+    def run(self) -> None:
+        try:
+            self.__run()
+        finally:
+            with self._lock:
+                self._done = True
+
+    def __run(self) -> None:
+        try:
+            self._mirror.touch(self._image_dir)
+        except OSError as e:
+            self.error = e
+            return
+        with ThreadPoolExecutor(max_workers=MIRROR_WORKERS) as executor:
+            while not self.isInterruptionRequested():
+                with self._lock:
+                    files = self.__next_batch()
+                    if len(files) == 0:
+                        self._done = True
+                        return
+                ok = sum(executor.map(self._mirror.copy, files))
+                self.copied += ok
+                self.failed += len(files) - ok
+                if not self._mirror.evict(keep=self._image_dir):
+                    self.full = True
+                    return
+
+    def __next_batch(self) -> list[str]:
+        first = self._pending.find(1, self._pos)
+        if first < 0:
+            first = self._pending.find(1)
+        if first < 0:
+            return []
+        end = self._pending.find(0, first, first + MIRROR_BATCH_FILES)
+        if end < 0:
+            end = min(first + MIRROR_BATCH_FILES, len(self._pending))
+        self._pending[first:end] = bytes(end - first)
+        self._pos = end
+        return self._files[first:end]
+
+
+def _file_stat(file_path: str) -> Optional[tuple[int, int]]:
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def _dir_usage(path: str) -> int:
+    # copies left behind by an interrupted copy are removed once stale. a
+    # copy carries the mtime of its source, so its ctime tells when it was
+    # last written.
+    usage = 0
+    now = time.time()
+    for entry in os.scandir(path):
+        if not entry.is_file():
+            continue
+        st = entry.stat()
+        if not entry.name.endswith('.tmp'):
+            usage += st.st_size
+        elif now - max(st.st_mtime, st.st_ctime) > STALE_TMP_SECONDS:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+    return usage
+
+
+def _dir_mtime(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
@@ -0,0 +1,119 @@
+from math import log
+from math import sqrt
+from typing import Optional
+from labelTrack.bbox import BBox
+
+
+FLAG_STALE: int = 2
+STALE_CHUNK: int = 4096
+
+
+def iou(a: BBox, b: BBox) -> float:
+    iw = min(a.xmax(), b.xmax()) - max(a.xmin(), b.xmin())
+    ih = min(a.ymax(), b.ymax()) - max(a.ymin(), b.ymin())
+    if (iw <= 0.0) or (ih <= 0.0):
+        return 0.0
+    inter = iw * ih
+    union = a.w * a.h + b.w * b.h - inter
+    return inter / union if union > 0.0 else 0.0
+
+
+def velocity(a: BBox, b: BBox) -> float:
+    # center displacement relative to the size of the previous bbox.
+    d = sqrt((b.cx() - a.cx()) ** 2 + (b.cy() - a.cy()) ** 2)
+    s = sqrt(max(a.w * a.h, 1e-6))
+    return d / s
+
+
+def scale_change(a: BBox, b: BBox) -> float:
+    area_a = max(a.w * a.h, 1e-6)
+    area_b = max(b.w * b.h, 1e-6)
+    return abs(log(area_b / area_a)) / 2.0
+
+
+class MotionOutliers(object):
+
+    # flags frames whose transition from the previous frame jumps in
+    # position or size. the flags of frames touched by a bulk edit are only
+    # marked stale and checked again when they are asked for.
+
+    def __init__(
+            self,
+            min_iou: float = 0.5,
+            max_velocity: float = 0.5,
+            max_scale: float = 1.5
+            ) -> None:
+        self.min_iou: float = min_iou
+        self.max_velocity: float = max_velocity
+        self.max_log_scale: float = log(max_scale)
+        self._bboxes: list[BBox] = []
+        self._flags: bytearray = bytearray()
+
+    def __len__(self) -> int:
+        self.__refresh(0, len(self._flags))
+        return self._flags.count(1)
+
+    def reset(self, bboxes: list[BBox]) -> None:
+        self._bboxes = bboxes
+        self._flags = bytearray(self.__check(idx) for idx in range(len(bboxes)))
+
+    def append(self, num: int) -> None:
+        start = len(self._flags)
+        self._flags.extend(self.__check(idx) for idx in range(start, start + num))
+
+    def update(self, idx: int) -> list[int]:
+        # an edit changes the transitions into idx and into idx + 1.
+        changed = []
+        for i in (idx, idx + 1):
+            if i >= len(self._flags):
+                break
+            flag = self.__check(i)
+            if flag != self._flags[i]:
+                self._flags[i] = flag
+                changed.append(i)
+        return changed
+
+    def invalidate(self, indices: range | list[int]) -> None:
+        num = len(self._flags)
+        if isinstance(indices, range) and (indices.step == 1):
+            stop = min(indices.stop + 1, num)
+            self._flags[indices.start:stop] = bytes([FLAG_STALE]) * (stop - indices.start)
+            return
+        for idx in indices:
+            self._flags[idx] = FLAG_STALE
+            if idx + 1 < num:
+                self._flags[idx + 1] = FLAG_STALE
+
+    def flagged(self, idx: int) -> bool:
+        if self._flags[idx] == FLAG_STALE:
+            self._flags[idx] = self.__check(idx)
+        return self._flags[idx] == 1
+
+    def next(self, idx: int) -> Optional[int]:
+        num = len(self._flags)
+        start = idx + 1
+        while True:
+            flagged = self._flags.find(1, start)
+            end = flagged if flagged >= 0 else num
+            stale = self._flags.find(FLAG_STALE, start, end)
+            if stale < 0:
+                return flagged if flagged >= 0 else None
+            self.__refresh(stale, min(end, stale + STALE_CHUNK))
+            start = stale
+
+    def __refresh(self, start: int, end: int) -> None:
+        stale = self._flags.find(FLAG_STALE, start, end)
+        while stale >= 0:
+            self._flags[stale] = self.__check(stale)
+            stale = self._flags.find(FLAG_STALE, stale + 1, end)
+
+    def __check(self, idx: int) -> bool:
+        if idx <= 0:
+            return False
+        a = self._bboxes[idx - 1]
+        b = self._bboxes[idx]
+        if a.empty() or b.empty():
+            return False
+        return (iou(a, b) < self.min_iou) or \
+               (velocity(a, b) > self.max_velocity) or \
+               (scale_change(a, b) > self.max_log_scale)
@@ -0,0 +1,107 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from typing import Optional
+from PyQt6.QtCore import QSize
+from PyQt6.QtCore import QThread
+from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtGui import QImage
+from PyQt6.QtGui import QImageReader
+
+
+HASH_CHUNK_SIZE: int = 64
+
+
+def dhash(file_path: str) -> Optional[int]:
+    # 64 bit difference hash of a 9x8 grayscale thumbnail. the jpeg reader
+    # decodes at a reduced scale when a small size is requested.
+    reader = QImageReader(file_path)
+    reader.setScaledSize(QSize(9, 8))
+    img = reader.read()
+    if img.isNull():
+        return None
+    img = img.convertToFormat(QImage.Format.Format_Grayscale8)
+    bpl = img.bytesPerLine()
+    data = img.constBits().asstring(img.sizeInBytes())
+    h = 0
+    for y in range(8):
+        row = data[y * bpl:y * bpl + 9]
+        for x in range(8):
+            h = (h << 1) | int(row[x] > row[x + 1])
+    return h
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class DuplicateRuns(object):
+
+    # runs of consecutive frames whose hashes differ by at most
+    # max_distance bits from the previous frame.
+
+    def __init__(self, max_distance: int = 4) -> None:
+        self.max_distance: int = max_distance
+        self._starts: list[int] = []
+        self._ends: list[int] = []
+
+    def reset(self, hashes: list[Optional[int]]) -> None:
+        num = len(hashes)
+        self._starts = [0] * num
+        self._ends = [0] * num
+        start = 0
+        for idx in range(num):
+            if (idx > 0) and not self.__similar(hashes[idx - 1], hashes[idx]):
+                start = idx
+            self._starts[idx] = start
+        end = num
+        for idx in range(num - 1, -1, -1):
+            self._ends[idx] = end
+            if self._starts[idx] == idx:
+                end = idx
+
+    def clear(self) -> None:
+        self._starts = []
+        self._ends = []
+
+    def ready(self) -> bool:
+        return len(self._starts) > 0
+
+    def run(self, idx: int) -> tuple[int, int]:
+        return self._starts[idx], self._ends[idx]
+
+    def runs(self, min_length: int = 2) -> list[tuple[int, int]]:
+        return [
+            (start, self._ends[start]) for start, s in enumerate(self._starts)
+            if (s == start) and (self._ends[start] - start >= min_length)]
+
+    def __similar(self, a: Optional[int], b: Optional[int]) -> bool:
+        return (a is not None) and \
+               (b is not None) and \
+               (hamming(a, b) <= self.max_distance)
+
+
+class HashThread(QThread):
+
+    # hashes frames in a process pool off the gui thread. workers are
+    # spawned rather than forked from the gui process.
+
+    hashed = pyqtSignal(list)
+    progress = pyqtSignal(int, int)
+
+    def __init__(self, files: list[tuple[int, str]], parent=None) -> None:
+        super(HashThread, self).__init__(parent)
+        self._files: list[tuple[int, str]] = files
+
+    def run(self) -> None:
+        num = len(self._files)
+        done = 0
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(mp_context=context) as executor:
+            for start in range(0, num, HASH_CHUNK_SIZE * 4):
+                if self.isInterruptionRequested():
+                    break
+                chunk = self._files[start:start + HASH_CHUNK_SIZE * 4]
+                hashes = executor.map(dhash, [f for _, f in chunk], chunksize=HASH_CHUNK_SIZE)
+                self.hashed.emit([(idx, h) for (idx, _), h in zip(chunk, hashes)])
+                done += len(chunk)
+                self.progress.emit(done, num)
@@ -0,0 +1,72 @@
+from collections import deque
+from functools import wraps
+import json
+import os
+import threading
+from time import perf_counter_ns
+from typing import Callable
+
+
+MAX_SPANS: int = 100000
+
+_enabled: bool = False
+_spans: deque[tuple[str, int, int, int]] = deque(maxlen=MAX_SPANS)
+
+
+def enable(enabled: bool = True) -> None:
+    global _enabled
+    _enabled = enabled
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def timed(name: str) -> Callable:
+    # records a span per call while profiling is enabled. when it is not,
+    # the only cost is the flag check in the wrapper.
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _spans.append((name, start, perf_counter_ns() - start, threading.get_ident()))
+        return wrapper
+    return decorator
+
+
+def reset() -> None:
+    _spans.clear()
+
+
+def summary() -> list[tuple[str, int, float, float, float]]:
+    # (name, count, p50, p95, max) with the latencies in milliseconds.
+    durations = {}
+    for name, _, dur, _ in list(_spans):
+        durations.setdefault(name, []).append(dur)
+    rows = []
+    for name in sorted(durations):
+        values = sorted(durations[name])
+        num = len(values)
+        rows.append((
+            name, num,
+            values[(num - 1) // 2] / 1e6,
+            values[min(num - 1, int(num * 0.95))] / 1e6,
+            values[-1] / 1e6))
+    return rows
+
+
+def export_chrome_trace(path: str) -> int:
+    # complete events of the chrome trace event format, loadable in
+    # chrome://tracing or perfetto.
+    pid = os.getpid()
+    events = [{
+        'name': name, 'ph': 'X', 'ts': start / 1e3, 'dur': dur / 1e3,
+        'pid': pid, 'tid': tid} for name, start, dur, tid in list(_spans)]
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    return len(events)
@@ -0,0 +1,193 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import os.path as osp
+import shutil
+import subprocess
+from typing import Optional
+from PyQt6.QtCore import QRectF
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QColor
+from PyQt6.QtGui import QGuiApplication
+from PyQt6.QtGui import QImage
+from PyQt6.QtGui import QImageReader
+from PyQt6.QtGui import QPainter
+from labelTrack.bbox import BBox
+from labelTrack.crops import image_bytes
+from labelTrack.drawing import draw_bbox
+from labelTrack.exporters import iter_frames
+from labelTrack.imagedir import ImageDir
+from labelTrack.imagedir import sequence_names
+
+
+RENDER_FORMATS: tuple[str] = ('mp4', 'gif', 'sheet')
+VIDEO_BATCH_SIZE: int = 256
+
+_app: Optional[QGuiApplication] = None
+
+
+def init_offscreen() -> None:
+    # painting text needs a gui application, which runs headless on the
+    # offscreen platform.
+    global _app
+    if QGuiApplication.instance() is not None:
+        return
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    _app = QGuiApplication([])
+
+
+def render_frame(
+        file_path: str,
+        bbox: BBox,
+        size: tuple[int, int],
+        text: Optional[str] = None
+        ) -> QImage:
+    w, h = size
+    out = QImage(w, h, QImage.Format.Format_RGB888)
+    out.fill(QColor(0, 0, 0))
+    reader = QImageReader(file_path)
+    reader.setAutoTransform(True)
+    img = reader.read()
+    p = QPainter(out)
+    p.setRenderHint(QPainter.RenderHint.Antialiasing)
+    p.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+    if not img.isNull():
+        scale = min(w / img.width(), h / img.height())
+        p.translate((w - img.width() * scale) / 2.0, (h - img.height() * scale) / 2.0)
+        p.scale(scale, scale)
+        p.drawImage(QRectF(0, 0, img.width(), img.height()), img)
+        draw_bbox(p, bbox, scale)
+        p.resetTransform()
+    if text is not None:
+        p.setPen(QColor(255, 255, 255))
+        p.drawText(QRectF(4, 4, w - 8, h - 8), Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop, text)
+    p.end()
+    return out
+
+
+def _render_frame_bytes(
+        file_path: str,
+        bbox: BBox,
+        size: tuple[int, int],
+        text: Optional[str]
+        ) -> bytes:
+    return image_bytes(render_frame(file_path, bbox, size, text))
+
+
+def render_size(image_index: ImageDir, width: int) -> tuple[int, int]:
+    w, h = image_index.size(0) or (width, width * 3 // 4)
+    height = int(round(width * h / w))
+    # yuv420p needs even dimensions.
+    return width - width % 2, max(2, height - height % 2)
+
+
+def render_video(
+        executor: ProcessPoolExecutor,
+        image_index: ImageDir,
+        label_file: str,
+        out_path: str,
+        width: int = 640,
+        fps: float = 30.0
+        ) -> None:
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise RuntimeError('ffmpeg is required to write videos.')
+    size = render_size(image_index, width)
+    cmd = [
+        ffmpeg, '-y', '-loglevel', 'error',
+        '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+        '-s', f'{size[0]}x{size[1]}', '-r', str(fps), '-i', '-']
+    if osp.splitext(out_path)[1].lower() == '.gif':
+        cmd += ['-vf', 'split[a][b];[a]palettegen[p];[b][p]paletteuse']
+    else:
+        cmd += ['-c:v', 'libx264', '-pix_fmt', 'yuv420p']
+    cmd.append(out_path)
+    num = len(image_index)
+    frames = list(iter_frames(image_index, label_file))
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    try:
+        # frames are submitted in batches to bound the rendered frames held
+        # in memory, and map yields them in order.
+        for start in range(0, num, VIDEO_BATCH_SIZE):
+            batch = frames[start:start + VIDEO_BATCH_SIZE]
+            results = executor.map(
+                _render_frame_bytes,
+                [file_path for _, file_path, _ in batch],
+                [bbox for _, _, bbox in batch],
+                [size] * len(batch),
+                [f'{idx + 1} / {num}' for idx, _, _ in batch],
+                chunksize=8)
+            for data in results:
+                proc.stdin.write(data)
+    finally:
+        proc.stdin.close()
+        ret = proc.wait()
+    if ret != 0:
+        raise RuntimeError(f'ffmpeg exited with {ret}')
+
+
+def render_sheet(
+        executor: ProcessPoolExecutor,
+        image_index: ImageDir,
+        label_file: str,
+        out_path: str,
+        width: int = 1600,
+        grid: tuple[int, int] = (6, 5)
+        ) -> None:
+    cols, rows = grid
+    num = len(image_index)
+    cnt = min(cols * rows, num)
+    picks = set(int(i * (num - 1) / max(cnt - 1, 1)) for i in range(cnt))
+    tile = render_size(image_index, width // cols)
+    frames = [frame for frame in iter_frames(image_index, label_file) if frame[0] in picks]
+    results = executor.map(
+        _render_frame_bytes,
+        [file_path for _, file_path, _ in frames],
+        [bbox for _, _, bbox in frames],
+        [tile] * len(frames),
+        [f'{idx + 1} / {num}' for idx, _, _ in frames])
+    sheet = QImage(tile[0] * cols, tile[1] * rows, QImage.Format.Format_RGB888)
+    sheet.fill(QColor(0, 0, 0))
+    p = QPainter(sheet)
+    for i, data in enumerate(results):
+        img = QImage(data, tile[0], tile[1], 3 * tile[0], QImage.Format.Format_RGB888)
+        p.drawImage(tile[0] * (i % cols), tile[1] * (i // cols), img)
+    p.end()
+    if not sheet.save(out_path):
+        raise RuntimeError(f'Could not write {out_path}')
+
+
+def render_sequences(
+        fmt: str,
+        sequences: list[tuple[str, str]],
+        out_dir: str,
+        width: Optional[int] = None,
+        fps: float = 30.0,
+        grid: tuple[int, int] = (6, 5),
+        jobs: Optional[int] = None):
+    init_offscreen()
+    os.makedirs(out_dir, exist_ok=True)
+    ext = 'png' if fmt == 'sheet' else fmt
+    # forked workers would inherit the ffmpeg pipe and the qt state of this
+    # process, so they are spawned.
+    executor = ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_offscreen)
+    names = sequence_names([image_dir for image_dir, _ in sequences])
+    with executor:
+        for image_dir, label_file in sequences:
+            out_path = osp.join(out_dir, f'{names[image_dir]}.{ext}')
+            try:
+                image_index = ImageDir(image_dir)
+                if len(image_index) == 0:
+                    raise ValueError(f'No image found in {image_dir}')
+                if fmt == 'sheet':
+                    render_sheet(executor, image_index, label_file, out_path, width or 1600, grid)
+                else:
+                    render_video(executor, image_index, label_file, out_path, width or 640, fps)
+                image_index.save()
+            except Exception as e:
+                yield image_dir, e
+                continue
+            yield image_dir, out_path
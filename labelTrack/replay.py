@@ -0,0 +1,214 @@
+import gzip
+import json
+import os.path as osp
+import shutil
+import tempfile
+import time
+from time import perf_counter
+from typing import Optional
+from PyQt6.QtCore import QEvent
+from PyQt6.QtCore import QObject
+from PyQt6.QtCore import QPoint
+from PyQt6.QtCore import QPointF
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QKeyEvent
+from PyQt6.QtGui import QMouseEvent
+from PyQt6.QtGui import QWheelEvent
+from PyQt6.QtTest import QTest
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtWidgets import QMessageBox
+from PyQt6.QtWidgets import QWidget
+from labelTrack.benchmark import percentiles
+
+
+RECORD_VERSION: int = 1
+
+_MOUSE_KINDS: dict[QEvent.Type, str] = {
+    QEvent.Type.MouseButtonPress: 'p',
+    QEvent.Type.MouseButtonRelease: 'r',
+    QEvent.Type.MouseButtonDblClick: 'c',
+    QEvent.Type.MouseMove: 'm'}
+
+
+class SessionRecorder(QObject):
+
+    # logs the key, mouse and wheel events delivered to the main window
+    # into a gzipped json lines file, one short array per event. a key
+    # reaches the focus widget as shortcut override and, unless a shortcut
+    # took it, again as key press; the pair is recorded once.
+
+    def __init__(self, window, record_file: str) -> None:
+        super(SessionRecorder, self).__init__(window)
+        self._window = window
+        self._file = gzip.open(record_file, 'wt')
+        self._start: float = perf_counter()
+        self._override: Optional[int] = None
+        header = {
+            'version': RECORD_VERSION,
+            'image_dir': window.image_dir(),
+            'label_path': window.label_file(),
+            'row': window.img_list.currentRow(),
+            'window': [window.width(), window.height()]}
+        self._file.write(json.dumps(header) + '\n')
+        QApplication.instance().installEventFilter(self)
+
+    def stop(self) -> None:
+        if self._file is None:
+            return
+        QApplication.instance().removeEventFilter(self)
+        self._file.close()
+        self._file = None
+
+    def eventFilter(self, obj: QObject, event: QEvent) -> bool:
+        kind = event.type()
+        if kind in (QEvent.Type.ShortcutOverride, QEvent.Type.KeyPress):
+            self.__record_key(obj, event)
+        elif kind in _MOUSE_KINDS:
+            self.__record_mouse(obj, event)
+        elif kind == QEvent.Type.Wheel:
+            self.__record_wheel(obj, event)
+        return False
+
+    def __record_key(self, obj: QObject, event: QKeyEvent) -> None:
+        target = self.__key_target(obj)
+        if (target is None) or (obj is not QApplication.focusWidget()):
+            return
+        if event.type() == QEvent.Type.ShortcutOverride:
+            self._override = event.key()
+        elif self._override == event.key():
+            self._override = None
+            return
+        self.__write([
+            'k', target, event.key(), event.modifiers().value,
+            event.text(), event.isAutoRepeat()])
+
+    def __record_mouse(self, obj: QObject, event: QMouseEvent) -> None:
+        target = self.__mouse_target(obj)
+        if target is None:
+            return
+        pos = event.position()
+        self.__write([
+            _MOUSE_KINDS[event.type()], target, round(pos.x(), 1), round(pos.y(), 1),
+            event.button().value, event.buttons().value, event.modifiers().value])
+
+    def __record_wheel(self, obj: QObject, event: QWheelEvent) -> None:
+        target = self.__mouse_target(obj)
+        if target is None:
+            return
+        pos = event.position()
+        angle = event.angleDelta()
+        self.__write([
+            'w', target, round(pos.x(), 1), round(pos.y(), 1), angle.x(), angle.y(),
+            event.buttons().value, event.modifiers().value])
+
+    def __write(self, record: list) -> None:
+        if record[0] != 'k':
+            self._override = None
+        t = round((perf_counter() - self._start) * 1e3, 1)
+        self._file.write(json.dumps([t] + record, separators=(',', ':')) + '\n')
+
+    def __key_target(self, obj: QObject) -> Optional[str]:
+        if not isinstance(obj, QWidget) or obj.window() is not self._window:
+            return None
+        if obj is self._window.canvas:
+            return 'canvas'
+        if obj is self._window.img_list:
+            return 'list'
+        return 'window'
+
+    def __mouse_target(self, obj: QObject) -> Optional[str]:
+        if obj is self._window.canvas:
+            return 'canvas'
+        if obj is self._window.img_list.viewport():
+            return 'list'
+        return None
+
+
+def read_session(record_file: str) -> tuple[dict, list[list]]:
+    with gzip.open(record_file, 'rt') as f:
+        header = json.loads(f.readline())
+        if header.get('version') != RECORD_VERSION:
+            raise ValueError(f'Unsupported session file {record_file}')
+        events = [json.loads(line) for line in f if line.strip() != '']
+    return header, events
+
+
+def event_name(record: list) -> str:
+    kind = record[1]
+    if kind == 'k':
+        return f'key {record[5] or hex(record[3])}'
+    return {'p': 'mouse press', 'r': 'mouse release', 'c': 'mouse double click',
+            'm': 'mouse move', 'w': 'wheel'}[kind]
+
+
+def replay_session(record_file: str, window, realtime: bool = False) -> dict:
+    # drives the window with the recorded events, on a copy of the label
+    # file, and times each event until the event loop is idle again.
+    header, events = read_session(record_file)
+    app = QApplication.instance()
+    tmp_dir = tempfile.mkdtemp()
+    boxes = (QMessageBox.information, QMessageBox.warning, QMessageBox.critical)
+    # a modal dialog would stall a headless replay.
+    QMessageBox.information = QMessageBox.warning = QMessageBox.critical = \
+        staticmethod(lambda *args, **kwargs: QMessageBox.StandardButton.No)
+    try:
+        label_path = None
+        if (header['label_path'] is not None) and osp.exists(header['label_path']):
+            label_path = osp.join(tmp_dir, osp.basename(header['label_path']))
+            shutil.copyfile(header['label_path'], label_path)
+        window.resize(*header['window'])
+        window.show()
+        window.open_sequence(header['image_dir'], label_path)
+        if header['row'] >= 0:
+            window.img_list.setCurrentRow(header['row'])
+        window.canvas.setFocus()
+        app.processEvents()
+        targets = {'canvas': window.canvas, 'list': window.img_list, 'window': window}
+        latencies = {}
+        start = perf_counter()
+        for record in events:
+            if realtime:
+                delay = record[0] / 1e3 - (perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            t = perf_counter()
+            _dispatch(targets, record)
+            app.processEvents()
+            latencies.setdefault(event_name(record), []).append(perf_counter() - t)
+        total = perf_counter() - start
+    finally:
+        QMessageBox.information, QMessageBox.warning, QMessageBox.critical = boxes
+        window.discard_changes()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return {
+        'events': len(events),
+        'total_s': total,
+        'latency': {name: percentiles(values) for name, values in sorted(latencies.items())}}
+
+
+def _dispatch(targets: dict[str, QWidget], record: list) -> None:
+    kind = record[1]
+    target = targets[record[2]]
+    if kind == 'k':
+        _, _, _, key, modifiers, text, repeat = record
+        # keys go through the shortcut map like real input.
+        QTest.keyPress(target, Qt.Key(key), Qt.KeyboardModifier(modifiers))
+        return
+    if record[2] == 'list':
+        target = target.viewport()
+    if kind == 'w':
+        _, _, _, x, y, dx, dy, buttons, modifiers = record
+        pos = QPointF(x, y)
+        event = QWheelEvent(
+            pos, QPointF(target.mapToGlobal(pos)), QPoint(), QPoint(dx, dy),
+            Qt.MouseButton(buttons), Qt.KeyboardModifier(modifiers),
+            Qt.ScrollPhase.NoScrollPhase, False)
+    else:
+        _, _, _, x, y, button, buttons, modifiers = record
+        types = {'p': QEvent.Type.MouseButtonPress, 'r': QEvent.Type.MouseButtonRelease,
+                 'c': QEvent.Type.MouseButtonDblClick, 'm': QEvent.Type.MouseMove}
+        pos = QPointF(x, y)
+        event = QMouseEvent(
+            types[kind], pos, QPointF(target.mapToGlobal(pos)),
+            Qt.MouseButton(button), Qt.MouseButton(buttons), Qt.KeyboardModifier(modifiers))
+    QApplication.sendEvent(target, event)
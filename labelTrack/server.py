@@ -0,0 +1,324 @@
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+import json
+import os
+import os.path as osp
+import threading
+import time
+from typing import Optional
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+from labelTrack.bbox import BBox
+from labelTrack.bbox import iter_label_file
+from labelTrack.bbox import parse_bbox
+from labelTrack.bbox import write_label_file
+from labelTrack.imagedir import ImageDir
+
+
+LOCK_TIMEOUT: float = 60.0
+MAX_EVENT_TIMEOUT: float = 30.0
+MAX_CHANGES: int = 10000
+
+
+class LabelStore(object):
+
+    # bboxes of one label file shared by the clients. a client holds the
+    # lock of the frame it shows, renewed while it polls for events, and an
+    # update of a frame held by another live client is rejected. every
+    # accepted update bumps the version and is kept in a bounded change log
+    # for the clients to catch up.
+
+    def __init__(self, label_path: str) -> None:
+        self.label_path: str = label_path
+        self.bboxes: list[BBox] = list(iter_label_file(label_path)) if osp.exists(label_path) else []
+        self.locks: dict[int, tuple[str, float]] = {}
+        self.changes: list[tuple[int, int, str, str]] = []
+        self.version: int = 0
+        self.dirty: bool = False
+
+    def holder(self, idx: int, now: float) -> Optional[str]:
+        lock = self.locks.get(idx)
+        if (lock is None) or (lock[1] < now):
+            return None
+        return lock[0]
+
+    def lock(self, idx: int, client: str, now: float) -> Optional[str]:
+        # returns the other client holding the frame, if any. a client
+        # holds at most one frame, so its previous lock is released.
+        holder = self.holder(idx, now)
+        if (holder is not None) and (holder != client):
+            return holder
+        self.unlock(client)
+        self.locks[idx] = (client, now + LOCK_TIMEOUT)
+        return None
+
+    def refresh(self, client: str, now: float) -> None:
+        for idx, (c, t) in list(self.locks.items()):
+            if (c == client) and (t >= now):
+                self.locks[idx] = (client, now + LOCK_TIMEOUT)
+
+    def unlock(self, client: str) -> None:
+        for idx in [idx for idx, (c, _) in self.locks.items() if c == client]:
+            del self.locks[idx]
+
+    def update(self, idx: int, bbox: BBox, client: str, now: float) -> bool:
+        holder = self.holder(idx, now)
+        if (holder is not None) and (holder != client):
+            return False
+        if idx >= len(self.bboxes):
+            self.bboxes.extend(BBox() for _ in range(idx + 1 - len(self.bboxes)))
+        self.bboxes[idx] = bbox
+        self.version += 1
+        self.changes.append((self.version, idx, str(bbox), client))
+        if len(self.changes) > MAX_CHANGES:
+            del self.changes[:len(self.changes) - MAX_CHANGES]
+        self.dirty = True
+        return True
+
+    def changes_since(self, version: int) -> Optional[list[tuple[int, int, str, str]]]:
+        # None means the log no longer reaches back to version.
+        if version >= self.version:
+            return []
+        if (len(self.changes) == 0) or (self.changes[0][0] > version + 1):
+            return None
+        start = len(self.changes) - (self.version - version)
+        return self.changes[start:]
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        tmp_path = self.label_path + '.tmp'
+        write_label_file(tmp_path, self.bboxes)
+        os.replace(tmp_path, self.label_path)
+        self.dirty = False
+
+
+class AnnotationServer(ThreadingHTTPServer):
+
+    # owns the directory manifests, the frame bytes read from slow storage
+    # and the label stores, so that several clients share them. requests
+    # are served on threads and every shared structure is guarded by one
+    # condition, which also wakes the clients waiting for changes. clients
+    # name paths on the server, which are confined to the served roots.
+
+    daemon_threads = True
+
+    def __init__(
+            self,
+            address: tuple[str, int],
+            roots: list[str],
+            max_frame_bytes: int = 512 * 1024 * 1024
+            ) -> None:
+        super(AnnotationServer, self).__init__(address, _Handler)
+        self.roots: list[str] = [osp.realpath(root) for root in roots]
+        self.max_frame_bytes: int = max_frame_bytes
+        self.cond: threading.Condition = threading.Condition()
+        self.image_dirs: dict[str, ImageDir] = {}
+        # the frame paths of each served directory, for checking requests.
+        self.frame_paths: dict[str, frozenset[str]] = {}
+        self.label_stores: dict[str, LabelStore] = {}
+        self._frames: OrderedDict[str, bytes] = OrderedDict()
+        self._frame_bytes: int = 0
+
+    def resolve(self, path: str) -> str:
+        path = osp.realpath(path)
+        for root in self.roots:
+            if osp.commonpath([path, root]) == root:
+                return path
+        raise PermissionError(f'{path} is outside the served directories')
+
+    def image_dir(self, image_dir: str) -> ImageDir:
+        image_dir = self.resolve(image_dir)
+        with self.cond:
+            image_index = self.image_dirs.get(image_dir)
+        if image_index is not None:
+            return image_index
+        # listed without the lock, slow storage must not stall other clients.
+        image_index = ImageDir(image_dir)
+        image_index.sizes()
+        image_index.save()
+        frame_paths = frozenset(image_index.files)
+        with self.cond:
+            image_index = self.image_dirs.setdefault(image_dir, image_index)
+            self.frame_paths.setdefault(image_index.image_dir, frame_paths)
+            return image_index
+
+    def label_store(self, label_path: str) -> LabelStore:
+        label_path = self.resolve(label_path)
+        store = self.label_stores.get(label_path)
+        if store is None:
+            store = LabelStore(label_path)
+            self.label_stores[label_path] = store
+        return store
+
+    def frame(self, file_path: str) -> bytes:
+        with self.cond:
+            data = self._frames.get(file_path)
+            if data is not None:
+                self._frames.move_to_end(file_path)
+                return data
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        with self.cond:
+            if file_path not in self._frames:
+                self._frames[file_path] = data
+                self._frame_bytes += len(data)
+            while (self._frame_bytes > self.max_frame_bytes) and (len(self._frames) > 1):
+                _, old = self._frames.popitem(last=False)
+                self._frame_bytes -= len(old)
+        return data
+
+    def save_all(self) -> None:
+        with self.cond:
+            for store in self.label_stores.values():
+                store.save()
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        try:
+            if url.path == '/sequence':
+                self.__sequence(query)
+            elif url.path == '/frame':
+                self.__frame(query)
+            elif url.path == '/labels':
+                self.__labels(query)
+            elif url.path == '/events':
+                self.__events(query)
+            else:
+                self.__send_json({'error': f'Unknown path {url.path}'}, 404)
+        except PermissionError as e:
+            self.__send_json({'error': str(e)}, 403)
+        except (OSError, KeyError, ValueError) as e:
+            self.__send_json({'error': str(e)}, 400)
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length)) if length > 0 else {}
+            if url.path == '/lock':
+                self.__lock(body)
+            elif url.path == '/unlock':
+                self.__unlock(body)
+            elif url.path == '/update':
+                self.__update(body)
+            elif url.path == '/save':
+                self.__save(body)
+            else:
+                self.__send_json({'error': f'Unknown path {url.path}'}, 404)
+        except PermissionError as e:
+            self.__send_json({'error': str(e)}, 403)
+        except (OSError, KeyError, ValueError) as e:
+            self.__send_json({'error': str(e)}, 400)
+
+    def __sequence(self, query: dict) -> None:
+        image_index = self.server.image_dir(query['image_dir'])
+        self.__send_json({
+            'image_dir': image_index.image_dir,
+            'files': [osp.basename(f) for f in image_index.files],
+            'sizes': image_index.sizes()})
+
+    def __frame(self, query: dict) -> None:
+        image_index = self.server.image_dir(query['image_dir'])
+        # only frames listed in a served directory can be read.
+        name = osp.basename(query['name'])
+        file_path = osp.join(image_index.image_dir, name)
+        if file_path not in self.server.frame_paths[image_index.image_dir]:
+            raise KeyError(name)
+        self.__send(self.server.frame(file_path), 'application/octet-stream')
+
+    # responses are built under the lock and sent after releasing it, so
+    # that a slow client does not stall the others.
+
+    def __labels(self, query: dict) -> None:
+        with self.server.cond:
+            store = self.server.label_store(query['label_path'])
+            now = time.monotonic()
+            data = {
+                'version': store.version,
+                'bboxes': [str(bbox) for bbox in store.bboxes],
+                'locks': {idx: client for idx, (client, t) in store.locks.items() if t >= now}}
+        self.__send_json(data)
+
+    def __events(self, query: dict) -> None:
+        since = int(query['since'])
+        timeout = min(float(query.get('timeout', MAX_EVENT_TIMEOUT)), MAX_EVENT_TIMEOUT)
+        with self.server.cond:
+            store = self.server.label_store(query['label_path'])
+            # polling for events keeps the locks of a client alive.
+            if 'client' in query:
+                store.refresh(query['client'], time.monotonic())
+            self.server.cond.wait_for(lambda: store.version > since, timeout)
+            changes = store.changes_since(since)
+            data = {
+                'version': store.version,
+                'reset': changes is None,
+                'changes': [[idx, bbox, client] for _, idx, bbox, client in changes or []]}
+        self.__send_json(data)
+
+    def __lock(self, body: dict) -> None:
+        with self.server.cond:
+            store = self.server.label_store(body['label_path'])
+            holder = store.lock(_frame_index(body['idx']), body['client'], time.monotonic())
+        self.__send_json({'ok': holder is None, 'holder': holder})
+
+    def __unlock(self, body: dict) -> None:
+        with self.server.cond:
+            self.server.label_store(body['label_path']).unlock(body['client'])
+        self.__send_json({'ok': True})
+
+    def __update(self, body: dict) -> None:
+        rejected = []
+        # every bbox is checked before any is applied.
+        bboxes = [(_frame_index(idx), parse_bbox(bbox)) for idx, bbox in body['bboxes']]
+        with self.server.cond:
+            store = self.server.label_store(body['label_path'])
+            now = time.monotonic()
+            for idx, bbox in bboxes:
+                if not store.update(idx, bbox, body['client'], now):
+                    rejected.append(idx)
+            self.server.cond.notify_all()
+        self.__send_json({'ok': len(rejected) == 0, 'rejected': rejected})
+
+    def __save(self, body: dict) -> None:
+        with self.server.cond:
+            self.server.label_store(body['label_path']).save()
+        self.__send_json({'ok': True})
+
+    def __send_json(self, data: dict, code: int = 200) -> None:
+        self.__send(json.dumps(data).encode('utf-8'), 'application/json', code)
+
+    def __send(self, data: bytes, content_type: str, code: int = 200) -> None:
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _frame_index(value) -> int:
+    idx = int(value)
+    if idx < 0:
+        raise ValueError(f'Invalid frame index {idx}')
+    return idx
+
+
+def serve(roots: list[str], host: str = '127.0.0.1', port: int = 8765) -> None:
+    server = AnnotationServer((host, port), roots)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.save_all()
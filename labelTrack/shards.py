@@ -0,0 +1,144 @@
+from itertools import islice
+import json
+import os
+import os.path as osp
+from typing import Optional
+from labelTrack.bbox import BBox
+from labelTrack.bbox import iter_label_file
+from labelTrack.bbox import write_label_file
+from labelTrack.imagedir import ImageDir
+from labelTrack.outliers import iou
+
+
+SHARD_VERSION: int = 1
+
+
+class Shard(object):
+
+    # an index range [start, end) of a sequence of total frames with its
+    # own label file. the shard file lists the frames of the range, so that
+    # it opens without listing the whole image directory.
+
+    def __init__(
+            self,
+            image_dir: str,
+            start: int,
+            end: int,
+            files: list[str],
+            label_path: str,
+            total: Optional[int] = None
+            ) -> None:
+        self.image_dir: str = image_dir
+        self.start: int = start
+        self.end: int = end
+        self.files: list[str] = files
+        self.label_path: str = label_path
+        self.total: Optional[int] = total
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def save(self, shard_file: str) -> None:
+        data = {
+            'version': SHARD_VERSION,
+            'image_dir': self.image_dir,
+            'start': self.start,
+            'end': self.end,
+            'total': self.total,
+            'files': self.files,
+            'label_path': osp.relpath(self.label_path, osp.dirname(osp.abspath(shard_file)))}
+        with open(shard_file, 'w') as f:
+            json.dump(data, f, indent=4)
+
+    @classmethod
+    def load(cls, shard_file: str) -> 'Shard':
+        with open(shard_file, 'r') as f:
+            data = json.load(f)
+        if data.get('version') != SHARD_VERSION:
+            raise ValueError(f'Unsupported shard file {shard_file}')
+        label_path = osp.join(osp.dirname(osp.abspath(shard_file)), data['label_path'])
+        # shard files written before the total was recorded have none.
+        return cls(
+            data['image_dir'], data['start'], data['end'],
+            data['files'], osp.normpath(label_path), data.get('total'))
+
+
+def split_sequence(
+        image_dir: str,
+        label_file: Optional[str],
+        out_dir: str,
+        shard_size: int,
+        overwrite: bool = False
+        ) -> list[str]:
+    image_index = ImageDir(image_dir)
+    num = len(image_index)
+    if num == 0:
+        raise ValueError(f'No image found in {image_dir}')
+    name = osp.basename(osp.normpath(image_dir))
+    # the shard label files may already hold the work of annotators.
+    if not overwrite:
+        for k in range(len(range(0, num, shard_size))):
+            for path in (osp.join(out_dir, f'{name}.shard{k}.txt'), osp.join(out_dir, f'{name}.shard{k}.json')):
+                if osp.exists(path):
+                    raise FileExistsError(f'{path} already exists')
+    os.makedirs(out_dir, exist_ok=True)
+    bboxes = iter_label_file(label_file) if (label_file is not None) and osp.exists(label_file) else iter([])
+    shard_files = []
+    for k, start in enumerate(range(0, num, shard_size)):
+        end = min(start + shard_size, num)
+        label_path = osp.join(out_dir, f'{name}.shard{k}.txt')
+        shard_bboxes = list(islice(bboxes, end - start))
+        shard_bboxes += [BBox() for _ in range(end - start - len(shard_bboxes))]
+        write_label_file(label_path, shard_bboxes)
+        shard = Shard(
+            image_index.image_dir, start, end,
+            [osp.basename(f) for f in image_index.files[start:end]],
+            label_path, num)
+        shard_file = osp.join(out_dir, f'{name}.shard{k}.json')
+        shard.save(shard_file)
+        shard_files.append(shard_file)
+    image_index.save()
+    return shard_files
+
+
+def merge_shards(
+        shard_files: list[str],
+        label_file: str,
+        min_iou: float = 0.5
+        ) -> list[str]:
+    # stitches the shard label files into label_file and returns the
+    # problems found at the shard boundaries.
+    shards = sorted((Shard.load(f) for f in shard_files), key=lambda s: s.start)
+    problems = []
+    for a, b in zip(shards, shards[1:]):
+        if a.image_dir != b.image_dir:
+            raise ValueError(f'Shards of different sequences: {a.image_dir}, {b.image_dir}')
+        if a.end != b.start:
+            raise ValueError(f'Shards are not contiguous: [{a.start}, {a.end}) and [{b.start}, {b.end})')
+    totals = set(s.total for s in shards if s.total is not None)
+    if len(totals) > 1:
+        raise ValueError(f'Shards of sequences of different lengths: {sorted(totals)}')
+    if len(shards) > 0 and shards[0].start != 0:
+        problems.append(f'First shard starts at frame {shards[0].start}')
+    if len(shards) > 0 and len(totals) == 1 and shards[-1].end != min(totals):
+        problems.append(f'Last shard ends at frame {shards[-1].end} of {min(totals)}')
+    # every shard label file is read before the label file is replaced.
+    shard_bboxes_list = []
+    for shard in shards:
+        shard_bboxes = list(islice(iter_label_file(shard.label_path), len(shard)))
+        shard_bboxes += [BBox() for _ in range(len(shard) - len(shard_bboxes))]
+        shard_bboxes_list.append(shard_bboxes)
+    last = None
+    with open(label_file, 'w') as f:
+        for shard, shard_bboxes in zip(shards, shard_bboxes_list):
+            if (last is not None) and (len(shard_bboxes) > 0):
+                first = shard_bboxes[0]
+                if last.empty() != first.empty():
+                    problems.append(f'Frame {shard.start}: bbox appears or vanishes at the shard boundary')
+                elif (not last.empty()) and (iou(last, first) < min_iou):
+                    problems.append(f'Frame {shard.start}: IoU {iou(last, first):.3f} at the shard boundary')
+            if len(shard_bboxes) > 0:
+                last = shard_bboxes[-1]
+            for bbox in shard_bboxes:
+                f.write(str(bbox) + '\n')
+    return problems
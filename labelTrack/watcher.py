@@ -0,0 +1,166 @@
+import ctypes
+import os
+import os.path as osp
+import struct
+import sys
+from typing import Optional
+from PyQt6.QtCore import QFileSystemWatcher
+from PyQt6.QtCore import QObject
+from PyQt6.QtCore import QSocketNotifier
+from PyQt6.QtCore import QTimer
+from PyQt6.QtCore import pyqtSignal
+from labelTrack.imagedir import image_extensions
+from labelTrack.imagedir import natural_sort
+
+
+IN_CLOSE_WRITE: int = 0x00000008
+IN_MOVED_TO: int = 0x00000080
+IN_Q_OVERFLOW: int = 0x00004000
+IN_NONBLOCK: int = 0o4000
+IN_CLOEXEC: int = 0o2000000
+INOTIFY_EVENT: struct.Struct = struct.Struct('iIII')
+
+
+class DirectoryFollower(QObject):
+
+    # emits frames written into image_dir after it was opened. on linux
+    # inotify reports the names of the files written or moved in, so a
+    # check only looks at those; elsewhere the watcher merely tells that the
+    # directory changed and it is scanned again, or polled when it cannot be
+    # watched. bursts of events are coalesced into one check. a new file is
+    # emitted once its size stopped changing between two checks, so frames
+    # still being written are not picked up half done.
+
+    files_added = pyqtSignal(list)
+
+    def __init__(
+            self,
+            image_dir: str,
+            known_files: list[str],
+            poll_interval: int = 500,
+            parent: Optional[QObject] = None
+            ) -> None:
+        super(DirectoryFollower, self).__init__(parent)
+        self._image_dir: str = osp.abspath(image_dir)
+        self._known: set[str] = set(osp.basename(f) for f in known_files)
+        self._pending: dict[str, int] = {}
+        self._changed: set[str] = set()
+        # the first check scans the directory for frames written between
+        # listing it and watching it.
+        self._rescan: bool = True
+        self._extensions: tuple[str] = image_extensions()
+        self._timer = QTimer(self)
+        self._timer.setInterval(poll_interval)
+        self._timer.timeout.connect(self.check)
+        self._watcher: Optional[QFileSystemWatcher] = None
+        self._notifier: Optional[QSocketNotifier] = None
+        self._fd: Optional[int] = _inotify_watch(self._image_dir)
+        if self._fd is not None:
+            self._notifier = QSocketNotifier(self._fd, QSocketNotifier.Type.Read, self)
+            self._notifier.activated.connect(self.__read_events)
+            self._watching: bool = True
+            return
+        self._watcher = QFileSystemWatcher(self)
+        self._watching = self._watcher.addPath(self._image_dir)
+        self._watcher.directoryChanged.connect(self.__directory_changed)
+        if not self._watching:
+            self._timer.start()
+
+    def stop(self) -> None:
+        self._timer.stop()
+        if self._notifier is not None:
+            self._notifier.setEnabled(False)
+            self._notifier.activated.disconnect(self.__read_events)
+            os.close(self._fd)
+            self._fd = None
+            return
+        self._watcher.directoryChanged.disconnect(self.__directory_changed)
+        if self._watching:
+            self._watcher.removePath(self._image_dir)
+
+    def __read_events(self) -> None:
+        names, overflow = _read_inotify(self._fd)
+        self._changed.update(names)
+        self._rescan = self._rescan or overflow
+        self.__schedule()
+
+    def __directory_changed(self) -> None:
+        self._rescan = True
+        self.__schedule()
+
+    def __schedule(self) -> None:
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def check(self) -> None:
+        ready = []
+        if self._rescan:
+            try:
+                names = [entry.name for entry in os.scandir(self._image_dir)]
+            except OSError:
+                return
+            self._rescan = self._fd is None
+        else:
+            names = self._changed.union(self._pending)
+        self._changed = set()
+        for name in names:
+            if (name in self._known) or \
+               (not name.lower().endswith(self._extensions)):
+                continue
+            try:
+                size = os.stat(osp.join(self._image_dir, name)).st_size
+            except OSError:
+                self._pending.pop(name, None)
+                continue
+            if (size > 0) and (self._pending.get(name) == size):
+                del self._pending[name]
+                self._known.add(name)
+                ready.append(osp.join(self._image_dir, name))
+            else:
+                self._pending[name] = size
+        # pending files are rechecked even if no further event arrives.
+        if self._watching and (len(self._pending) == 0):
+            self._timer.stop()
+        if len(ready) > 0:
+            natural_sort(ready, key=lambda x: x.lower())
+            self.files_added.emit(ready)
+
+
+def _inotify_watch(path: str) -> Optional[int]:
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(path), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _read_inotify(fd: int) -> tuple[list[str], bool]:
+    names = []
+    overflow = False
+    while True:
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            break
+        except OSError:
+            overflow = True
+            break
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+            elif len(name) > 0:
+                names.append(os.fsdecode(name))
+    return names, overflow
@@ -0,0 +1,132 @@
+import json
+import os
+import os.path as osp
+from typing import Optional
+from PyQt6.QtCore import QThread
+from PyQt6.QtCore import pyqtSignal
+from labelTrack.framecache import FrameCache
+from labelTrack.imagedir import ImageDir
+
+
+WORKSPACE_VERSION: int = 1
+PRELOAD_FRAMES: int = 8
+
+
+class Sequence(object):
+
+    def __init__(
+            self,
+            image_dir: str,
+            label_path: str,
+            done: bool = False,
+            labeled: int = 0,
+            frames: int = 0
+            ) -> None:
+        self.image_dir: str = image_dir
+        self.label_path: str = label_path
+        self.done: bool = done
+        self.labeled: int = labeled
+        self.frames: int = frames
+
+    def name(self) -> str:
+        return osp.basename(osp.normpath(self.image_dir))
+
+
+class Workspace(object):
+
+    # a queue of (image dir, label file) pairs with their completion
+    # status. paths are stored relative to the workspace file, so that
+    # it moves together with the data.
+
+    def __init__(self, sequences: Optional[list[Sequence]] = None) -> None:
+        self.sequences: list[Sequence] = sequences if sequences is not None else []
+
+    def __len__(self) -> int:
+        return len(self.sequences)
+
+    def __getitem__(self, idx: int) -> Sequence:
+        return self.sequences[idx]
+
+    def add(self, image_dir: str, label_path: str) -> Sequence:
+        idx = self.index(image_dir)
+        if idx is not None:
+            self.sequences[idx].label_path = label_path
+            return self.sequences[idx]
+        sequence = Sequence(osp.abspath(image_dir), osp.abspath(label_path))
+        self.sequences.append(sequence)
+        return sequence
+
+    def index(self, image_dir: str) -> Optional[int]:
+        image_dir = osp.abspath(image_dir)
+        for idx, sequence in enumerate(self.sequences):
+            if sequence.image_dir == image_dir:
+                return idx
+        return None
+
+    def next_pending(self, idx: int) -> Optional[int]:
+        num = len(self.sequences)
+        for i in range(1, num + 1):
+            j = (idx + i) % num
+            if not self.sequences[j].done:
+                return j
+        return None
+
+    def save(self, workspace_file: str) -> None:
+        base_dir = osp.dirname(osp.abspath(workspace_file))
+        data = {
+            'version': WORKSPACE_VERSION,
+            'sequences': [{
+                'image_dir': osp.relpath(s.image_dir, base_dir),
+                'label_path': osp.relpath(s.label_path, base_dir),
+                'done': s.done,
+                'labeled': s.labeled,
+                'frames': s.frames} for s in self.sequences]}
+        tmp_path = workspace_file + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp_path, workspace_file)
+
+    @classmethod
+    def load(cls, workspace_file: str) -> 'Workspace':
+        with open(workspace_file, 'r') as f:
+            data = json.load(f)
+        if data.get('version') != WORKSPACE_VERSION:
+            raise ValueError(f'Unsupported workspace file {workspace_file}')
+        base_dir = osp.dirname(osp.abspath(workspace_file))
+        return cls([
+            Sequence(
+                osp.normpath(osp.join(base_dir, s['image_dir'])),
+                osp.normpath(osp.join(base_dir, s['label_path'])),
+                s.get('done', False), s.get('labeled', 0), s.get('frames', 0))
+            for s in data['sequences']])
+
+
+class PreloadThread(QThread):
+
+    # lists the next sequence and decodes its first frames into the shared
+    # cache while the current one is being labeled. a sequence that cannot
+    # be listed is emitted as None.
+
+    loaded = pyqtSignal(str, object)
+
+    def __init__(self, image_dir: str, frame_cache: FrameCache, parent=None) -> None:
+        super(PreloadThread, self).__init__(parent)
+        self._image_dir: str = image_dir
+        self._frame_cache: FrameCache = frame_cache
+
+    def run(self) -> None:
+        try:
+            image_index = ImageDir(self._image_dir)
+            num = min(len(image_index), PRELOAD_FRAMES)
+            for idx in range(num):
+                if self.isInterruptionRequested():
+                    return
+                image_index.size(idx)
+                self._frame_cache.image(image_index.files[idx])
+            if num > 0:
+                self._frame_cache.thumbnail(image_index.files[0])
+            image_index.save()
+        except OSError:
+            self.loaded.emit(self._image_dir, None)
+            return
+        self.loaded.emit(self._image_dir, image_index)